@@ -0,0 +1,223 @@
+"""Benchmark the poll path against the local mock API.
+
+Drives DeWarmteAPIClient directly and the tier coordinators inside a bare
+HomeAssistant instance, for a range of device counts, and reports poll
+latency percentiles, requests and bytes per poll and the cost of the
+entity fan-out that follows a coordinator update.
+
+    python -m benchmarks.bench_poll --devices 1,10,50,200 --polls 20 --latency 0.05
+"""
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+
+import aiohttp
+
+from benchmarks.mock_api import MockDeWarmteAPI
+from custom_components.dewarmte.const import INSIGHTS_MAX_CONCURRENCY, TIER_STATUS, TIER_INSIGHTS
+from custom_components.dewarmte.dewarmte_api_client import DeWarmteAPIClient
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def make_client(base_url, session):
+    """Return a client pointed at the mock server."""
+
+    class BenchAPIClient(DeWarmteAPIClient):
+        TOKEN_URL = f"{base_url}/v1/auth/token/"
+        REFRESH_URL = f"{base_url}/v1/auth/token/refresh/"
+        BASE_URL = base_url
+
+    return BenchAPIClient("bench@example.com", "bench", session)
+
+
+async def client_poll(client, max_concurrency):
+    """One poll of all tiers through the bare client, as the coordinators do it."""
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _insights(device_id):
+        async with semaphore:
+            return await client.async_get_insights(device_id)
+
+    await client.async_ensure_authenticated()
+    devices, _ = await asyncio.gather(client.async_get_devices(), client.async_get_outdoor_temp())
+    await asyncio.gather(*(_insights(device["id"]) for device in devices))
+
+
+async def bench_client(api, base_url, polls, max_concurrency):
+    async with aiohttp.ClientSession() as session:
+        client = make_client(base_url, session)
+        # Warm-up poll pays for the initial authentication
+        await client_poll(client, max_concurrency)
+        api.reset_counters()
+
+        latencies = []
+        failures = 0
+        for _ in range(polls):
+            start = time.perf_counter()
+            try:
+                await client_poll(client, max_concurrency)
+            except Exception:
+                failures += 1
+            latencies.append(time.perf_counter() - start)
+        await client.async_close()
+
+    return {
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "requests_per_poll": api.total_requests / polls,
+        "bytes_per_poll": api.bytes_sent / polls,
+        "failed_polls": failures,
+    }
+
+
+def _attach_entities(hass, coordinators):
+    """Register real device entities with a stubbed state write that counts and times them.
+
+    The stub reads what Home Assistant would on a write (availability,
+    value and attributes), so the fan-out cost includes the gating in
+    DeWarmteEntity and the accessors of each description.
+    """
+    from custom_components.dewarmte.binary_sensor import BINARY_SENSORS, DeWarmteBinarySensor
+    from custom_components.dewarmte.sensor import SENSORS, DeWarmteSensor
+
+    stats = {"writes": 0, "calls": 0, "seconds": 0.0}
+    unsubs = []
+
+    def _write_state(entity, read_value):
+        def _write():
+            stats["writes"] += 1
+            if entity.available:
+                read_value(entity)
+            entity.extra_state_attributes
+        return _write
+
+    def _listener(entity):
+        def _update():
+            start = time.perf_counter()
+            stats["calls"] += 1
+            entity._handle_coordinator_update()
+            stats["seconds"] += time.perf_counter() - start
+        return _update
+
+    platforms = (
+        (SENSORS, DeWarmteSensor, lambda entity: entity.native_value),
+        (BINARY_SENSORS, DeWarmteBinarySensor, lambda entity: entity.is_on),
+    )
+    for device_id, device in coordinators[TIER_STATUS].data.items():
+        for descriptions, entity_class, read_value in platforms:
+            for description in descriptions:
+                coordinator = coordinators[description.tier]
+                entity = entity_class(coordinator, description, device_id, device.nickname, device.model)
+                entity.hass = hass
+                entity.async_write_ha_state = _write_state(entity, read_value)
+                unsubs.append(coordinator.async_add_listener(_listener(entity)))
+    return stats, unsubs
+
+
+async def bench_coordinators(api, base_url, polls):
+    from homeassistant.core import HomeAssistant
+    from custom_components.dewarmte.coordinator import (
+        DeWarmteUpdateCoordinator,
+        DeWarmteOutdoorCoordinator,
+        DeWarmteInsightsCoordinator,
+    )
+    from custom_components.dewarmte.const import TIER_OUTDOOR
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        async with aiohttp.ClientSession() as session:
+            client = make_client(base_url, session)
+            status = DeWarmteUpdateCoordinator(hass, client)
+            coordinators = {
+                TIER_STATUS: status,
+                TIER_OUTDOOR: DeWarmteOutdoorCoordinator(hass, client),
+                TIER_INSIGHTS: DeWarmteInsightsCoordinator(hass, client, status),
+            }
+            await status.async_refresh()
+            stats, unsubs = _attach_entities(hass, coordinators)
+            api.reset_counters()
+
+            latencies = []
+            for _ in range(polls):
+                start = time.perf_counter()
+                await status.async_refresh()
+                await asyncio.gather(
+                    coordinators[TIER_OUTDOOR].async_refresh(),
+                    coordinators[TIER_INSIGHTS].async_refresh(),
+                )
+                latencies.append(time.perf_counter() - start)
+
+            for unsub in unsubs:
+                unsub()
+            for coordinator in coordinators.values():
+                await coordinator.async_shutdown()
+            await client.async_close()
+        await hass.async_stop(force=True)
+
+    return {
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "requests_per_poll": api.total_requests / polls,
+        "bytes_per_poll": api.bytes_sent / polls,
+        "listener_calls_per_poll": stats["calls"] / polls,
+        "state_writes_per_poll": stats["writes"] / polls,
+        "fanout_us_per_poll": stats["seconds"] / polls * 1e6,
+    }
+
+
+async def run(args):
+    results = []
+    for devices in args.devices:
+        api = MockDeWarmteAPI(devices, args.latency, args.latency_jitter, args.error_rate, args.token_ttl)
+        base_url = await api.start()
+        try:
+            row = {"devices": devices, "client": await bench_client(api, base_url, args.polls, args.max_concurrency)}
+            if not args.client_only:
+                row["coordinators"] = await bench_coordinators(api, base_url, args.polls)
+        finally:
+            await api.stop()
+        results.append(row)
+    return results
+
+
+def _print_table(results):
+    for row in results:
+        print(f"devices={row['devices']}")
+        for target in ("client", "coordinators"):
+            if target in row:
+                values = "  ".join(f"{key}={value:.1f}" for key, value in row[target].items())
+                print(f"  {target:<13} {values}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", default="1,10,50,200", type=lambda v: [int(n) for n in v.split(",")])
+    parser.add_argument("--polls", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every mock response")
+    parser.add_argument("--latency-jitter", type=float, default=0.01)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--token-ttl", type=int, default=1800)
+    parser.add_argument("--max-concurrency", type=int, default=INSIGHTS_MAX_CONCURRENCY)
+    parser.add_argument("--client-only", action="store_true", help="skip the coordinator benchmark")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        _print_table(results)
+
+
+if __name__ == "__main__":
+    main()
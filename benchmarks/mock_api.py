@@ -0,0 +1,184 @@
+"""Local stand-in for api.mydewarmte.com.
+
+Serves the endpoints the integration uses with configurable device count,
+latency, error rate and token lifetime, and counts requests and bytes so
+benchmarks can report per-poll cost.
+
+    python -m benchmarks.mock_api --devices 10 --latency 0.05 --port 8765
+"""
+import argparse
+import asyncio
+import base64
+import json
+import random
+import time
+from collections import Counter
+from datetime import datetime
+
+from aiohttp import web
+
+
+def _b64(data):
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip("=")
+
+
+def make_token(kind, ttl):
+    """Return an unsigned JWT-shaped token, enough for the client's exp parsing."""
+    return ".".join([
+        _b64({"alg": "none", "typ": "JWT"}),
+        _b64({"token_type": kind, "exp": int(time.time() + ttl), "jti": random.getrandbits(64)}),
+        "mock",
+    ])
+
+
+class MockDeWarmteAPI:
+    """aiohttp application mimicking the DeWarmte customer API."""
+
+    def __init__(self, devices=1, latency=0.0, latency_jitter=0.0, error_rate=0.0, token_ttl=1800, refresh_ttl=86400):
+        self.devices = devices
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.token_ttl = token_ttl
+        self.refresh_ttl = refresh_ttl
+        self.requests = Counter()
+        self.bytes_sent = 0
+        self._access_tokens = {}  # token -> expiry
+        self._refresh_tokens = set()
+
+        self.app = web.Application(middlewares=[self._middleware])
+        self.app.router.add_post("/v1/auth/token/", self._token)
+        self.app.router.add_post("/v1/auth/token/refresh/", self._refresh)
+        self.app.router.add_get("/v1/customer/products/", self._products)
+        # Registered before the {device_id} routes so it isn't taken for a device
+        self.app.router.add_get("/v1/customer/products/tb-status/", self._tb_status)
+        self.app.router.add_get("/v1/customer/products/{device_id}/insights/", self._insights)
+
+    def reset_counters(self):
+        self.requests.clear()
+        self.bytes_sent = 0
+
+    @property
+    def total_requests(self):
+        return sum(self.requests.values())
+
+    @web.middleware
+    async def _middleware(self, request, handler):
+        route = request.match_info.route.resource
+        self.requests[route.canonical if route is not None else request.path] += 1
+        if self.latency or self.latency_jitter:
+            await asyncio.sleep(max(self.latency + random.uniform(-self.latency_jitter, self.latency_jitter), 0))
+        if self.error_rate and random.random() < self.error_rate:
+            return web.json_response({"detail": "mock error"}, status=500)
+        response = await handler(request)
+        if response.body is not None:
+            self.bytes_sent += len(response.body)
+        return response
+
+    def _issue(self):
+        access = make_token("access", self.token_ttl)
+        self._access_tokens[access] = time.time() + self.token_ttl
+        return access
+
+    def _authorized(self, request):
+        token = request.headers.get("Authorization", "").removeprefix("Bearer ")
+        expiry = self._access_tokens.get(token)
+        return expiry is not None and expiry > time.time()
+
+    async def _token(self, request):
+        body = await request.json()
+        if not body.get("email") or not body.get("password"):
+            return web.json_response({"detail": "No active account"}, status=401)
+        refresh = make_token("refresh", self.refresh_ttl)
+        self._refresh_tokens.add(refresh)
+        return web.json_response({"access": self._issue(), "refresh": refresh})
+
+    async def _refresh(self, request):
+        body = await request.json()
+        if body.get("refresh") not in self._refresh_tokens:
+            return web.json_response({"detail": "Token is invalid or expired"}, status=401)
+        return web.json_response({"access": self._issue()})
+
+    async def _products(self, request):
+        if not self._authorized(request):
+            return web.json_response({"detail": "Unauthorized"}, status=401)
+        results = [
+            {
+                "id": device_id,
+                "nickname": f"Pump {device_id}",
+                "type": "AO",
+                "status": {
+                    "is_on": random.random() < 0.5,
+                    "is_connected": True,
+                    "gas_boiler": False,
+                    "thermostat": random.random() < 0.5,
+                    "supply_temperature": round(random.uniform(25, 45), 1),
+                    "target_temperature": 21.0,
+                    "actual_temperature": round(random.uniform(19, 22), 1),
+                    "heat_input": round(random.uniform(0, 2), 2),
+                    "heat_output": round(random.uniform(0, 8), 2),
+                    "water_flow": round(random.uniform(0, 20), 1),
+                    "electricity_consumption": round(random.uniform(0, 2), 2),
+                },
+            }
+            for device_id in range(1, self.devices + 1)
+        ]
+        return web.json_response({"count": len(results), "results": results})
+
+    async def _tb_status(self, request):
+        if not self._authorized(request):
+            return web.json_response({"detail": "Unauthorized"}, status=401)
+        return web.json_response({"outdoor_temperature": round(random.uniform(-5, 15), 1)})
+
+    async def _insights(self, request):
+        if not self._authorized(request):
+            return web.json_response({"detail": "Unauthorized"}, status=401)
+        start = datetime.strptime(request.query["start_date"], "%Y-%m-%d")
+        hours = max(min(int((datetime.now() - start).total_seconds() // 3600) + 1, 24 * 31), 1)
+        data = [
+            {
+                "electricity_consumed": round(random.uniform(0, 1.5), 3),
+                "heat_produced": round(random.uniform(0, 5), 3),
+                "cop": round(random.uniform(2.5, 5), 2),
+            }
+            for _ in range(hours)
+        ]
+        electricity = sum(point["electricity_consumed"] for point in data)
+        heat = sum(point["heat_produced"] for point in data)
+        return web.json_response({
+            "data": data,
+            "heat_sum": round(heat, 3),
+            "electricity_sum": round(electricity, 3),
+            "cop": round(heat / electricity, 2) if electricity else None,
+        })
+
+    async def start(self, host="127.0.0.1", port=0):
+        """Start serving and return the base URL."""
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        return f"http://{host}:{port}"
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--latency-jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 500")
+    parser.add_argument("--token-ttl", type=int, default=1800, help="access token lifetime in seconds")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    api = MockDeWarmteAPI(args.devices, args.latency, args.latency_jitter, args.error_rate, args.token_ttl)
+    web.run_app(api.app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
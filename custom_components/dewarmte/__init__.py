@@ -1,34 +1,84 @@
-from homeassistant.helpers import aiohttp_client
-from .const import DOMAIN, PLATFORMS
+from .const import DOMAIN, PLATFORMS, CONTROL_PLATFORMS, CONF_DEVICES, CONF_CONTROLS, DEFAULT_CONTROLS
 import logging
 
-from .coordinator import DeWarmteUpdateCoordinator
-from .dewarmte_api_client import DeWarmteAPIClient
+import homeassistant.helpers.config_validation as cv
+
+from .account import account_entries, account_key, account_options, account_storage_id, get_account, get_store, is_primary_entry
+from .services import async_setup_services
+from .storage import DeWarmteStore
 
 _LOGGER = logging.getLogger(__name__)
 
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+
+async def async_setup(hass, config):
+    async_setup_services(hass)
+    return True
+
 async def async_setup_entry(hass, entry):
     hass.data.setdefault(DOMAIN, {})
-    session = aiohttp_client.async_get_clientsession(hass)
-    api_client = DeWarmteAPIClient(entry.data["username"], entry.data["password"], session)
-    _LOGGER.info("DeWarmteAPIClient Client Initialized.")
 
-    # Initialize coordinator with client
-    coordinator = DeWarmteUpdateCoordinator(hass, api_client)
-    await coordinator.async_config_entry_first_refresh()
+    # Entries of the same account share one client, token and set of coordinators
+    account = get_account(hass, entry.data["username"], entry.data["password"], account_options(hass, entry))
+    await account.async_acquire(entry.entry_id)
 
-    # Store coordinator and client for other platforms
+    # Store coordinators and client for other platforms
+    devices = entry.options.get(CONF_DEVICES, entry.data.get(CONF_DEVICES))
     hass.data[DOMAIN][entry.entry_id] = {
-        "coordinaFtor": coordinator,
-        "client": api_client,
+        "account": account,
+        "coordinators": account.coordinators,
+        "client": account.client,
+        "store": account.store,
+        # Device ids (as strings) this entry exposes, None for all
+        "devices": set(devices) if devices else None,
     }
 
+    # Controls write to a guessed endpoint, they stay off unless the user opts in
+    platforms = PLATFORMS + CONTROL_PLATFORMS if entry.options.get(CONF_CONTROLS, DEFAULT_CONTROLS) else PLATFORMS
+    hass.data[DOMAIN][entry.entry_id]["platforms"] = platforms
+
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
+
     # Forward setup to sensor platform
-    await hass.config_entries.async_forward_entry_setups(entry, ["sensor", "binary_sensor"])
+    await hass.config_entries.async_forward_entry_setups(entry, platforms)
     return True
 
+def exposes_device(entry_data, device_id):
+    """Return True if the entry's device filter lets device_id through."""
+    return entry_data["devices"] is None or str(device_id) in entry_data["devices"]
+
 async def async_unload_entry(hass, entry):
-    for platform in PLATFORMS:
+    # The platforms set up with, the options may have changed since
+    for platform in hass.data[DOMAIN][entry.entry_id]["platforms"]:
         await hass.config_entries.async_forward_entry_unload(entry, platform)
-    hass.data[DOMAIN].pop(entry.entry_id)
+    data = hass.data[DOMAIN].pop(entry.entry_id)
+    await data["account"].async_release(entry.entry_id)
     return True
+
+async def async_remove_entry(hass, entry):
+    """Drop stored tokens and snapshots when the last entry of an account is deleted."""
+    key = account_key(entry.data["username"])
+    others = [
+        other for other in hass.config_entries.async_entries(DOMAIN)
+        if other.entry_id != entry.entry_id and account_key(other.data["username"]) == key
+    ]
+    if not others:
+        # The account's own store, a scheduled save of another instance would bring the files back
+        await get_store(hass, entry.data["username"]).async_remove()
+        hass.data[DOMAIN]["stores"].pop(account_storage_id(entry.data["username"]), None)
+    # Stores from before entries shared an account were kept per entry
+    await DeWarmteStore(hass, entry.entry_id).async_remove()
+
+async def async_reload_entry(hass, entry):
+    """Reload the entry when its options change."""
+    if not is_primary_entry(entry):
+        # Only the device filter, the running account stays as it is
+        await hass.config_entries.async_reload(entry.entry_id)
+        return
+    # Account-level options apply when the account restarts, which needs every entry unloaded
+    entries = [other for other in account_entries(hass, entry.data["username"]) if other.entry_id in hass.data.get(DOMAIN, {})]
+    for other in entries:
+        await hass.config_entries.async_unload(other.entry_id)
+    for other in entries:
+        await hass.config_entries.async_setup(other.entry_id)
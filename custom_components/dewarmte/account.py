@@ -0,0 +1,285 @@
+import asyncio
+import hashlib
+import logging
+
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import ConfigEntryNotReady
+
+from .const import (
+    DOMAIN,
+    CONF_STATUS_INTERVAL,
+    CONF_OUTDOOR_INTERVAL,
+    CONF_INSIGHTS_INTERVAL,
+    CONF_MIN_STATUS_INTERVAL,
+    CONF_MAX_STATUS_INTERVAL,
+    CONF_BACKFILL_DAYS,
+    CONF_HISTORY_DAYS,
+    CONF_DEVICES,
+    DEFAULT_STATUS_INTERVAL,
+    DEFAULT_MIN_STATUS_INTERVAL,
+    DEFAULT_MAX_STATUS_INTERVAL,
+    DEFAULT_OUTDOOR_INTERVAL,
+    DEFAULT_INSIGHTS_INTERVAL,
+    DEFAULT_BACKFILL_DAYS,
+    DEFAULT_HISTORY_DAYS,
+    TIER_STATUS,
+    TIER_OUTDOOR,
+    TIER_INSIGHTS,
+)
+from .coordinator import (
+    DeWarmteUpdateCoordinator,
+    DeWarmteOutdoorCoordinator,
+    DeWarmteInsightsCoordinator,
+)
+from .backfill import InsightsBackfill
+from .controls import DeviceSettingsWriter
+from .derived import DerivedMetrics
+from .dewarmte_api_client import DeWarmteAPIClient
+from .export import async_create_exporter
+from .history import InsightsHistory
+from .session import async_create_session
+from .statistics import InsightsStatisticsImporter
+from .storage import DeWarmteStore
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def account_key(username):
+    """Return the registry key of an account."""
+    return username.strip().lower()
+
+
+def account_storage_id(username):
+    """Return a storage id for the account that doesn't put the e-mail in a file name."""
+    return hashlib.sha256(account_key(username).encode()).hexdigest()[:16]
+
+
+def is_primary_entry(entry):
+    """Return True for the account's first entry, the one that exposes all devices by default."""
+    return not entry.data.get(CONF_DEVICES)
+
+
+def account_entries(hass: HomeAssistant, username):
+    """Return the config entries of an account, the primary one first."""
+    key = account_key(username)
+    entries = [entry for entry in hass.config_entries.async_entries(DOMAIN) if account_key(entry.data["username"]) == key]
+    return sorted(entries, key=lambda entry: not is_primary_entry(entry))
+
+
+def account_options(hass: HomeAssistant, entry):
+    """Return the account-level options, these are set on the primary entry only."""
+    for other in account_entries(hass, entry.data["username"]):
+        if is_primary_entry(other):
+            return other.options
+    return entry.options
+
+
+def get_store(hass: HomeAssistant, username):
+    """Return the account's store, one instance so scheduled saves and removal don't race."""
+    stores = hass.data.setdefault(DOMAIN, {}).setdefault("stores", {})
+    storage_id = account_storage_id(username)
+    store = stores.get(storage_id)
+    if store is None:
+        store = stores[storage_id] = DeWarmteStore(hass, storage_id)
+    return store
+
+
+def get_account(hass: HomeAssistant, username, password, options):
+    """Return the shared account for username, creating it on first use."""
+    accounts = hass.data.setdefault(DOMAIN, {}).setdefault("accounts", {})
+    key = account_key(username)
+    account = accounts.get(key)
+    if account is None:
+        account = accounts[key] = DeWarmteAccount(hass, key, username, password, options)
+    return account
+
+
+class DeWarmteAccount:
+    """Client, coordinators and store shared by all config entries of one account.
+
+    Entries acquire the account on setup and release it on unload, the last
+    release shuts everything down. Intervals come from the options of the
+    entry that started the account.
+    """
+
+    def __init__(self, hass: HomeAssistant, key, username, password, options):
+        self.hass = hass
+        self.key = key
+        self.entry_ids = set()
+        self.store = get_store(hass, username)
+
+        # Its own connection pool, sized for the requests the account's scheduler lets through
+        self._session = async_create_session(hass)
+        self._unsub_close = hass.bus.async_listen_once(EVENT_HOMEASSISTANT_CLOSE, self._async_close_session)
+        self.client = DeWarmteAPIClient(username, password, self._session)
+        _LOGGER.info("DeWarmteAPIClient Client Initialized.")
+
+        # One coordinator per update tier, each with its own interval
+        status_coordinator = DeWarmteUpdateCoordinator(
+            hass,
+            self.client,
+            options.get(CONF_STATUS_INTERVAL, DEFAULT_STATUS_INTERVAL),
+            options.get(CONF_MIN_STATUS_INTERVAL, DEFAULT_MIN_STATUS_INTERVAL),
+            options.get(CONF_MAX_STATUS_INTERVAL, DEFAULT_MAX_STATUS_INTERVAL),
+        )
+        self.coordinators = {
+            TIER_STATUS: status_coordinator,
+            TIER_OUTDOOR: DeWarmteOutdoorCoordinator(
+                hass, self.client, options.get(CONF_OUTDOOR_INTERVAL, DEFAULT_OUTDOOR_INTERVAL)
+            ),
+            TIER_INSIGHTS: DeWarmteInsightsCoordinator(
+                hass, self.client, status_coordinator, options.get(CONF_INSIGHTS_INTERVAL, DEFAULT_INSIGHTS_INTERVAL)
+            ),
+        }
+        self.importer = InsightsStatisticsImporter(
+            hass, self.store, options.get(CONF_BACKFILL_DAYS, DEFAULT_BACKFILL_DAYS)
+        )
+        self.derived = DerivedMetrics()
+        self.history = InsightsHistory(options.get(CONF_HISTORY_DAYS, DEFAULT_HISTORY_DAYS))
+        # Hourly insights go into long-term statistics and the history, each past day is fetched once for both
+        self.backfill = InsightsBackfill(
+            hass, self.client, (self.importer, self.history), self._save_history, self.history.set_live
+        )
+        self.writer = DeviceSettingsWriter(hass, self.client, status_coordinator)
+        # None unless an export sink is configured
+        self.exporter = async_create_exporter(hass, options, self.coordinators)
+        self._start_lock = asyncio.Lock()
+        self._running = False
+        self._unsubs = []
+        self._tasks = []
+
+    async def async_acquire(self, entry_id):
+        """Start the account if needed and register the entry."""
+        # Entries set up concurrently wait for a single start
+        async with self._start_lock:
+            if not self._running:
+                try:
+                    await self._async_start()
+                except Exception:
+                    # Nothing of a failed start may keep running, the retry builds a new
+                    # account on the same store and a stale one would overwrite it
+                    await self._async_shutdown()
+                    if not self.entry_ids:
+                        self.hass.data[DOMAIN]["accounts"].pop(self.key, None)
+                    raise
+                self._running = True
+        self.entry_ids.add(entry_id)
+
+    async def _async_start(self):
+        stored = await self.store.async_load()
+        if self.store.tokens:
+            self.client.restore_tokens(self.store.tokens)
+        self.client.set_token_listener(self.store.save_tokens)
+        self.derived.restore(self.store.derived)
+        self.history.restore(await self.store.async_load_history())
+
+        coordinators = self.coordinators
+        snapshots = self.store.snapshots
+        if stored and all(tier in snapshots for tier in coordinators):
+            # Create entities from the last known data, the API catches up in the background
+            _LOGGER.debug("Starting from stored snapshot")
+            for tier, coordinator in coordinators.items():
+                coordinator.async_restore(snapshots[tier])
+            self._tasks.append(
+                self.hass.async_create_background_task(self._async_refresh_all(), f"{DOMAIN}_initial_refresh")
+            )
+        else:
+            # Insights need the device list, so status goes first
+            await coordinators[TIER_STATUS].async_refresh()
+            if coordinators[TIER_STATUS].last_update_success:
+                await asyncio.gather(
+                    coordinators[TIER_OUTDOOR].async_refresh(),
+                    coordinators[TIER_INSIGHTS].async_refresh(),
+                )
+            for coordinator in coordinators.values():
+                if not coordinator.last_update_success:
+                    raise ConfigEntryNotReady(
+                        f"{coordinator.name} refresh failed: {coordinator.last_exception}"
+                    ) from coordinator.last_exception
+
+        for tier, coordinator in coordinators.items():
+            self._unsubs.append(coordinator.async_add_listener(self._snapshot_saver(tier, coordinator)))
+        # Registered before the entities, so derived sensors see this update's values
+        self._unsubs.append(coordinators[TIER_STATUS].async_add_listener(self._update_derived))
+        self._unsubs.append(coordinators[TIER_STATUS].async_add_listener(self.writer.async_status_updated))
+        self._unsubs.append(coordinators[TIER_INSIGHTS].async_add_listener(self._update_insights))
+        if self.exporter is not None:
+            self._unsubs.append(coordinators[TIER_STATUS].async_add_listener(self.exporter.async_export))
+        # Backfilled once, then streamed with each insights update
+        self.backfill.async_update(self.device_names())
+
+    async def async_release(self, entry_id):
+        """Unregister the entry, shutting the account down after the last one."""
+        self.entry_ids.discard(entry_id)
+        if self.entry_ids:
+            return False
+        self.hass.data[DOMAIN]["accounts"].pop(self.key, None)
+        await self._async_shutdown()
+        return True
+
+    async def _async_shutdown(self):
+        for unsub in self._unsubs:
+            unsub()
+        self._unsubs = []
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        self.client.set_token_listener(None)
+        self.writer.async_shutdown()
+        self.backfill.async_shutdown()
+        if self.exporter is not None:
+            self.exporter.async_shutdown()
+        for coordinator in self.coordinators.values():
+            await coordinator.async_shutdown()
+        await self.client.async_close()
+        if self._unsub_close is not None:
+            self._unsub_close()
+            self._unsub_close = None
+        await self._session.close()
+        await self.store.async_flush()
+
+    async def _async_close_session(self, _event):
+        self._unsub_close = None
+        await self._session.close()
+
+    async def _async_refresh_all(self):
+        await self.coordinators[TIER_STATUS].async_refresh()
+        await asyncio.gather(
+            self.coordinators[TIER_OUTDOOR].async_refresh(),
+            self.coordinators[TIER_INSIGHTS].async_refresh(),
+        )
+
+    def device_names(self):
+        return {
+            device_id: device.nickname
+            for device_id, device in (self.coordinators[TIER_STATUS].data or {}).items()
+        }
+
+    @callback
+    def _update_derived(self):
+        coordinator = self.coordinators[TIER_STATUS]
+        # Restored data was already counted before the restart
+        data = coordinator.data if coordinator.last_update_success and not coordinator.restored else None
+        if self.derived.update(data):
+            self.store.save_derived(self.derived.as_json())
+
+    @callback
+    def _save_history(self):
+        self.store.save_history(self.history.as_json)
+
+    @callback
+    def _update_insights(self):
+        self.history.begin_update()
+        if self.coordinators[TIER_INSIGHTS].last_update_success:
+            self.backfill.async_update(self.device_names())
+        if self.history.updated:
+            self._save_history()
+
+    def _snapshot_saver(self, tier, coordinator):
+        @callback
+        def _save():
+            # changed_keys is None or a non-empty set when there is something new to save
+            if coordinator.last_update_success and not coordinator.restored and coordinator.changed_keys != set():
+                self.store.save_snapshot(tier, coordinator.data)
+        return _save
@@ -0,0 +1,112 @@
+import logging
+from datetime import timedelta
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN
+from .insights import async_fetch_closed_days, hour_is_closed
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class InsightsBackfill:
+    """Feed closed hourly insights to the statistics importer and the history.
+
+    Consumers report the first hour they lack (first_missing_hour) and take
+    buckets in time order (add_buckets). Past days are fetched once per
+    device and handed to every consumer that lacks them. A device streams
+    today's closed hours from the insights cache only once it is caught up,
+    older hours can't be added after newer ones.
+
+    The cache starts over at local midnight, before the day's last hour has
+    settled, so that hour never shows up as closed in it. A device that
+    lacks a closed hour of a past day goes back to catching up, which
+    fetches that day again. An hour still missing after its day was fetched
+    is not in the API, it isn't asked for again.
+    """
+
+    def __init__(self, hass: HomeAssistant, client, consumers, on_progress, on_live):
+        self.hass = hass
+        self.client = client
+        self.consumers = consumers
+        self._on_progress = on_progress  # called after each fetched day and each catch-up
+        self._on_live = on_live  # called with a device and whether it is caught up
+        self.live = set()  # devices streamed from the insights cache
+        self._attempted = {}  # device_id -> first missing past hour after its last catch-up
+        self._task = None
+
+    @callback
+    def async_update(self, devices):
+        """Insights listener: stream closed hours of caught-up devices, catch up the others.
+
+        devices is {device_id: name}.
+        """
+        now = dt_util.now()
+        for device_id in [device_id for device_id in self.live if device_id in devices]:
+            missing = self._first_missing_past_hour(device_id, now)
+            if missing is not None and missing != self._attempted.get(device_id):
+                self.live.discard(device_id)
+                self._on_live(device_id, False)
+        behind = {device_id: name for device_id, name in devices.items() if device_id not in self.live}
+        if behind and self._task is None:
+            self._task = self.hass.async_create_background_task(
+                self._async_catch_up(behind), f"{DOMAIN}_insights_backfill"
+            )
+        for device_id, name in devices.items():
+            if device_id in self.live:
+                self._stream(device_id, name)
+
+    def _first_missing_past_hour(self, device_id, now):
+        """Return the first closed hour before today that a consumer lacks, None if none does."""
+        today_start = dt_util.start_of_local_day(now)
+        starts = [consumer.first_missing_hour(device_id) for consumer in self.consumers]
+        return min(
+            (start for start in starts if start is not None and start < today_start and hour_is_closed(start, now)),
+            default=None,
+        )
+
+    def _stream(self, device_id, name):
+        cache = self.client.insights_cache(device_id)
+        if cache is None:
+            return
+        buckets = cache.completed_buckets()
+        for consumer in self.consumers:
+            consumer.add_buckets(device_id, name, buckets)
+
+    async def _async_catch_up(self, devices):
+        try:
+            for device_id, name in devices.items():
+                try:
+                    await self._async_backfill_device(device_id, name)
+                except Exception as err:
+                    # Tried again after the next insights update
+                    _LOGGER.warning("Insights backfill for device %s stopped: %s", device_id, err)
+                    continue
+                self.live.add(device_id)
+                self._on_live(device_id, True)
+                self._stream(device_id, name)
+        finally:
+            self._task = None
+            self._on_progress()
+
+    async def _async_backfill_device(self, device_id, name):
+        today_start = dt_util.start_of_local_day(dt_util.now())
+        starts = [(consumer, consumer.first_missing_hour(device_id)) for consumer in self.consumers]
+        starts = [(consumer, start) for consumer, start in starts if start is not None and start < today_start]
+        if not starts:
+            self._attempted[device_id] = None
+            return
+        first_day = dt_util.as_local(min(start for _, start in starts)).date()
+        days = [first_day + timedelta(days=n) for n in range((today_start.date() - first_day).days)]
+        async for day, buckets in async_fetch_closed_days(self.client, device_id, days):
+            for consumer, start in starts:
+                consumer.add_buckets(device_id, name, [bucket for bucket in buckets if bucket[0] >= start])
+            self._on_progress()
+        self._attempted[device_id] = self._first_missing_past_hour(device_id, dt_util.now())
+        _LOGGER.debug("Backfilled insights of device %s from %s", device_id, first_day)
+
+    @callback
+    def async_shutdown(self):
+        if self._task is not None:
+            self._task.cancel()
@@ -1,24 +1,50 @@
 import logging
+from dataclasses import dataclass
+from functools import partial
+
 from homeassistant.components.binary_sensor import (
     BinarySensorEntity,
+    BinarySensorEntityDescription,
     BinarySensorDeviceClass,
 )
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.device_registry import DeviceInfo
 
-from .const import DOMAIN
+from .entity import (
+    DeWarmteEntity,
+    DeWarmteEntityDescription,
+    async_track_device_entities,
+    section_available,
+    section_value,
+)
+from .const import DOMAIN, TIER_STATUS
 
 _LOGGER = logging.getLogger(__name__)
 
-BINARY_SENSOR_KEYS = {
-    "is_on": BinarySensorDeviceClass.RUNNING,
-    "gas_boiler": BinarySensorDeviceClass.RUNNING,
-    "is_connected": BinarySensorDeviceClass.CONNECTIVITY,
-    "thermostat": BinarySensorDeviceClass.RUNNING,
-}
+
+@dataclass(frozen=True, kw_only=True)
+class DeWarmteBinarySensorEntityDescription(DeWarmteEntityDescription, BinarySensorEntityDescription):
+    """Describes a DeWarmte device binary sensor."""
+
+
+def _status_binary_sensor(key, device_class):
+    return DeWarmteBinarySensorEntityDescription(
+        key=key,
+        tier=TIER_STATUS,
+        section=TIER_STATUS,
+        value_fn=section_value(TIER_STATUS, key),
+        available_fn=section_available(TIER_STATUS),
+        device_class=device_class,
+    )
+
+
+BINARY_SENSORS = (
+    _status_binary_sensor("is_on", BinarySensorDeviceClass.RUNNING),
+    _status_binary_sensor("gas_boiler", BinarySensorDeviceClass.RUNNING),
+    _status_binary_sensor("is_connected", BinarySensorDeviceClass.CONNECTIVITY),
+    _status_binary_sensor("thermostat", BinarySensorDeviceClass.RUNNING),
+)
 
 
 async def async_setup_entry(
@@ -27,69 +53,29 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up MyIntegration binary sensors from config entry."""
-    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinaFtor"]
-
-    entities = []
-
-    for device_id, device in coordinator.data.items():
-        nickname = device.get("nickname", device_id)
-        status = device.get("status", {})
-        device_model = device.get("type", {})
-
-        for key, device_class in BINARY_SENSOR_KEYS.items():
-            if key in status:
-                name = f"{nickname} {key.replace('_', ' ').title()}"
-                entities.append(
-                    MyBinarySensor(
-                        coordinator=coordinator,
-                        device_id=device_id,
-                        device_name=nickname,
-                        device_model=device_model,
-                        key=key,
-                        name=name,
-                        device_class=device_class,
-                    )
+    entry_data = hass.data[DOMAIN][entry.entry_id]
+    coordinator = entry_data["coordinators"][TIER_STATUS]
+
+    def _device_entities(device_id, device):
+        # Only keys the device reports, others show up once it does
+        status = device.status
+        if status is None:
+            return
+        for description in BINARY_SENSORS:
+            if getattr(status, description.key) is not None:
+                yield description.key, partial(
+                    DeWarmteBinarySensor, coordinator, description, device_id, device.nickname, device.model
                 )
 
-    if entities:
-        async_add_entities(entities)
-
+    async_track_device_entities(entry, entry_data, coordinator, _device_entities, async_add_entities)
 
-class MyBinarySensor(CoordinatorEntity, BinarySensorEntity):
-    """Representation of a binary sensor."""
 
-    def __init__(self, coordinator, device_id, device_name, device_model, key, name, device_class):
-        super().__init__(coordinator)
-        self.device_id = device_id
-        self.key = key
-        self.device_name = device_name
-        self.device_model = device_model
+class DeWarmteBinarySensor(DeWarmteEntity, BinarySensorEntity):
+    """Binary sensor of a DeWarmte device."""
 
-        self._attr_name = name
-        self._attr_unique_id = f"{device_id}_{key}"
-        self._attr_device_class = device_class
+    entity_description: DeWarmteBinarySensorEntityDescription
 
     @property
     def is_on(self):
         """Return true if the binary sensor is on."""
-        device_data = self.coordinator.data.get(self.device_id, {})
-        return device_data.get("status", {}).get(self.key)
-
-    @property
-    def available(self):
-        """Return True if entity is available."""
-        return (
-            super().available
-            and self.device_id in self.coordinator.data
-            and self.coordinator.data[self.device_id].get("status") is not None
-        )
-
-    @property
-    def device_info(self) -> DeviceInfo:
-        return DeviceInfo(
-            identifiers={(DOMAIN, self.device_id)},
-            name=self.device_name,
-            manufacturer="DeWarmte",
-            model=self.device_model,
-            configuration_url="https://my.dewarmte.com",
-        )
\ No newline at end of file
+        return self._value
@@ -1,10 +1,62 @@
 from homeassistant import config_entries
+from homeassistant.core import callback
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
 import voluptuous as vol
 from .const import DOMAIN
-from .const import API_TOKEN_URL
+from .const import (
+    CONF_STATUS_INTERVAL,
+    CONF_OUTDOOR_INTERVAL,
+    CONF_INSIGHTS_INTERVAL,
+    CONF_MIN_STATUS_INTERVAL,
+    CONF_MAX_STATUS_INTERVAL,
+    CONF_BACKFILL_DAYS,
+    CONF_HISTORY_DAYS,
+    CONF_DEVICES,
+    CONF_CONTROLS,
+    DEFAULT_CONTROLS,
+    CONF_EXPORT,
+    CONF_EXPORT_URL,
+    CONF_EXPORT_TOKEN,
+    CONF_EXPORT_TOPIC,
+    EXPORT_NONE,
+    EXPORT_INFLUXDB,
+    EXPORT_MQTT,
+    DEFAULT_EXPORT_TOPIC,
+    DEFAULT_STATUS_INTERVAL,
+    DEFAULT_MIN_STATUS_INTERVAL,
+    DEFAULT_MAX_STATUS_INTERVAL,
+    DEFAULT_OUTDOOR_INTERVAL,
+    DEFAULT_INSIGHTS_INTERVAL,
+    DEFAULT_BACKFILL_DAYS,
+    DEFAULT_HISTORY_DAYS,
+)
 import aiohttp
+import asyncio
 import logging
-from homeassistant.exceptions import ConfigEntryAuthFailed
+from .account import account_key, is_primary_entry
+from .dewarmte_api_client import DeWarmteAPIClient
+
+
+def _account_devices(hass, key):
+    """Return {device_id: nickname} of a running account, empty if it isn't loaded."""
+    account = hass.data.get(DOMAIN, {}).get("accounts", {}).get(key)
+    if account is None:
+        return {}
+    return {str(device_id): name for device_id, name in account.device_names().items()}
+
+
+def _claimed_devices(hass, key, exclude_entry_id=None):
+    """Return device ids exposed by other entries of the account, None if one exposes all."""
+    claimed = set()
+    for entry in hass.config_entries.async_entries(DOMAIN):
+        if entry.entry_id == exclude_entry_id or account_key(entry.data["username"]) != key:
+            continue
+        devices = entry.options.get(CONF_DEVICES, entry.data.get(CONF_DEVICES))
+        if not devices:
+            return None
+        claimed.update(devices)
+    return claimed
 
 class MyIntegrationConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle a config flow for My Integration."""
@@ -12,42 +64,43 @@ class MyIntegrationConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     VERSION = 1
     _LOGGER = logging.getLogger(__name__)
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        """Return the options flow for this handler."""
+        return DeWarmteOptionsFlow(config_entry)
+
     async def async_step_user(self, user_input=None):
         """Handle the initial step."""
         errors = {}
-        session = aiohttp.ClientSession()
         if user_input is not None:
-            # Here you could test the connection, e.g., login
+            # A single login, HA's general session is enough, each account opens its own pool
+            client = DeWarmteAPIClient(user_input["username"], user_input["password"], async_get_clientsession(self.hass))
             try:
-                user_details = {
-                    "email": user_input["username"],
-                    "password": user_input["password"]
-                }
-
-                logging.info(user_details)
-                async with session.post(f"{API_TOKEN_URL}", json=user_details) as resp:
-
-                    data = await resp.json()
-                    if resp.status == 200:
-                        logging.info("Tokens fetched.")
-                        return self.async_create_entry(
-                            title=user_input["username"],
-                            data=user_input,
-                        )
-                    else:
-                        logging.error(data)
-                        errors["base"] = "Authentication failed."
-
-            except ConfigEntryAuthFailed:
-                logging.error("Tokens cannot be fetched.")
-                logging.error("Failed to refresh tokens. Please check your credentials.")
-                errors["base"] = "Authentication failed."
-                raise  # Re-raise to let HA handle it cleanly
+                await client.authenticate()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logging.error(f"Cannot reach the DeWarmte API: {e}")
+                errors["base"] = "Cannot connect to the DeWarmte API."
             except Exception as e:
                 logging.error(f"Error during initialization: {e}")
                 errors["base"] = "Authentication failed."
+            else:
+                logging.info("Tokens fetched.")
+                key = account_key(user_input["username"])
+                if _claimed_devices(self.hass, key) == set():
+                    # First entry of this account, it exposes every device
+                    await self.async_set_unique_id(key)
+                    self._abort_if_unique_id_configured()
+                    return self.async_create_entry(
+                        title=user_input["username"],
+                        data=user_input,
+                    )
+                # The account is already set up, this entry shares it for a subset of devices
+                self._user_input = user_input
+                return await self.async_step_devices()
+            finally:
+                await client.async_close()
 
-        await session.close()
         # Form schema
         return self.async_show_form(
             step_id="user",
@@ -57,3 +110,127 @@ class MyIntegrationConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             }),
             errors=errors,
         )
+
+    async def async_step_devices(self, user_input=None):
+        """Pick the devices of an already configured account this entry exposes."""
+        key = account_key(self._user_input["username"])
+        claimed = _claimed_devices(self.hass, key)
+        if claimed is None:
+            return self.async_abort(reason="already_configured")
+        available = {
+            device_id: name for device_id, name in _account_devices(self.hass, key).items()
+            if device_id not in claimed
+        }
+        if not available:
+            return self.async_abort(reason="already_configured")
+
+        if user_input is not None and user_input[CONF_DEVICES]:
+            devices = sorted(user_input[CONF_DEVICES])
+            await self.async_set_unique_id(f"{key}_{'_'.join(devices)}")
+            self._abort_if_unique_id_configured()
+            return self.async_create_entry(
+                title=f"{self._user_input['username']} ({', '.join(available[d] for d in devices)})",
+                data={**self._user_input, CONF_DEVICES: devices},
+            )
+
+        return self.async_show_form(
+            step_id="devices",
+            data_schema=vol.Schema({
+                vol.Required(CONF_DEVICES): cv.multi_select(available),
+            }),
+        )
+
+
+class DeWarmteOptionsFlow(config_entries.OptionsFlow):
+    """Handle update intervals for the polling tiers and the exposed devices."""
+
+    def __init__(self, config_entry):
+        self._entry = config_entry
+
+    async def async_step_init(self, user_input=None):
+        """Manage the options."""
+        errors = {}
+        key = account_key(self._entry.data["username"])
+        claimed = _claimed_devices(self.hass, key, self._entry.entry_id)
+        current_devices = self._entry.options.get(CONF_DEVICES, self._entry.data.get(CONF_DEVICES, []))
+        primary = is_primary_entry(self._entry)
+        if user_input is not None:
+            devices = set(user_input.get(CONF_DEVICES, []))
+            overlaps = claimed is None or (claimed and (not devices or devices & claimed))
+            if overlaps and devices != set(current_devices):
+                errors["base"] = "These devices are already exposed by another entry of this account."
+            elif primary and not (
+                user_input[CONF_MIN_STATUS_INTERVAL]
+                <= user_input[CONF_STATUS_INTERVAL]
+                <= user_input[CONF_MAX_STATUS_INTERVAL]
+            ):
+                errors["base"] = "Status interval must lie between the min and max interval."
+            elif primary and user_input[CONF_EXPORT] == EXPORT_INFLUXDB and not user_input.get(CONF_EXPORT_URL):
+                errors["base"] = "InfluxDB export needs a write URL."
+            else:
+                return self.async_create_entry(title="", data=user_input)
+
+        options = self._entry.options
+        schema = {
+            vol.Optional(
+                CONF_DEVICES,
+                default=current_devices,
+            ): cv.multi_select({**{d: d for d in current_devices}, **_account_devices(self.hass, key)}),
+            vol.Required(
+                CONF_CONTROLS,
+                default=options.get(CONF_CONTROLS, DEFAULT_CONTROLS),
+            ): bool,
+        }
+        if primary:
+            # Polling, history and export are shared by the account, only its first entry sets them
+            schema.update({
+                vol.Required(
+                    CONF_STATUS_INTERVAL,
+                    default=options.get(CONF_STATUS_INTERVAL, DEFAULT_STATUS_INTERVAL),
+                ): vol.All(vol.Coerce(int), vol.Range(min=30)),
+                vol.Required(
+                    CONF_MIN_STATUS_INTERVAL,
+                    default=options.get(CONF_MIN_STATUS_INTERVAL, DEFAULT_MIN_STATUS_INTERVAL),
+                ): vol.All(vol.Coerce(int), vol.Range(min=30)),
+                vol.Required(
+                    CONF_MAX_STATUS_INTERVAL,
+                    default=options.get(CONF_MAX_STATUS_INTERVAL, DEFAULT_MAX_STATUS_INTERVAL),
+                ): vol.All(vol.Coerce(int), vol.Range(min=30)),
+                vol.Required(
+                    CONF_OUTDOOR_INTERVAL,
+                    default=options.get(CONF_OUTDOOR_INTERVAL, DEFAULT_OUTDOOR_INTERVAL),
+                ): vol.All(vol.Coerce(int), vol.Range(min=60)),
+                vol.Required(
+                    CONF_INSIGHTS_INTERVAL,
+                    default=options.get(CONF_INSIGHTS_INTERVAL, DEFAULT_INSIGHTS_INTERVAL),
+                ): vol.All(vol.Coerce(int), vol.Range(min=300)),
+                vol.Required(
+                    CONF_BACKFILL_DAYS,
+                    default=options.get(CONF_BACKFILL_DAYS, DEFAULT_BACKFILL_DAYS),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=365)),
+                vol.Required(
+                    CONF_HISTORY_DAYS,
+                    default=options.get(CONF_HISTORY_DAYS, DEFAULT_HISTORY_DAYS),
+                ): vol.All(vol.Coerce(int), vol.Range(min=7, max=1100)),
+                vol.Required(
+                    CONF_EXPORT,
+                    default=options.get(CONF_EXPORT, EXPORT_NONE),
+                ): vol.In([EXPORT_NONE, EXPORT_INFLUXDB, EXPORT_MQTT]),
+                vol.Optional(
+                    CONF_EXPORT_URL,
+                    default=options.get(CONF_EXPORT_URL, ""),
+                ): str,
+                vol.Optional(
+                    CONF_EXPORT_TOKEN,
+                    default=options.get(CONF_EXPORT_TOKEN, ""),
+                ): str,
+                vol.Optional(
+                    CONF_EXPORT_TOPIC,
+                    default=options.get(CONF_EXPORT_TOPIC, DEFAULT_EXPORT_TOPIC),
+                ): str,
+            })
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema(schema),
+            errors=errors,
+        )
@@ -1,9 +1,100 @@
 DOMAIN = "dewarmte"
 PLATFORMS = ["sensor", "binary_sensor"]
+# Write to the unconfirmed settings endpoint, only set up when the controls option is on
+CONTROL_PLATFORMS = ["number", "switch"]
 
 API_BASE_URL = "https://api.mydewarmte.com"
 API_TOKEN_URL = f"{API_BASE_URL}/v1/auth/token/"
-TOKEN_REFRESH_MIN = 30
+TOKEN_REFRESH_MIN = 30  # fallback when the token has no exp claim
+TOKEN_EXPIRY_MARGIN_SEC = 60
+TOKEN_PROACTIVE_REFRESH_SEC = 300
+
+# Request scheduler limits, per account
+API_RATE_LIMIT = 10  # requests per second
+API_RATE_BURST = 20
+API_MAX_IN_FLIGHT = 6
+# Bytes, larger responses are JSON-decoded in the executor
+JSON_EXECUTOR_THRESHOLD = 64 * 1024
+
+# HTTP session of one account
+# Connections above API_MAX_IN_FLIGHT, for token refreshes and the retry after a 401
+# (sent while the first response is still open), so no request waits for a connection
+HTTP_POOL_HEADROOM = 2
+HTTP_KEEPALIVE_TIMEOUT = 75  # seconds an idle connection is kept, outlives the status interval
+HTTP_DNS_CACHE_TTL = 300
+# (total, connect, read) timeouts in seconds, per endpoint
+AUTH_TIMEOUT = (15, 5, 10)
+DEFAULT_ENDPOINT_TIMEOUT = (20, 5, 15)
+ENDPOINT_TIMEOUTS = {
+    "/v1/customer/products/": (20, 5, 15),
+    "/v1/customer/products/tb-status/": (15, 5, 10),
+    # Multi-day hourly insights are the large responses
+    "/v1/customer/products/{id}/insights/": (45, 5, 30),
+    "/v1/customer/products/{id}/settings/": (15, 5, 10),
+}
 API_REFRESH_URL = f"{API_BASE_URL}/v1/auth/token/refresh/"
 API_PRODUCTS_PATH = "/v1/customer/products/"
-API_TB_STATUS= "/v1/customer/products/tb-status/"
\ No newline at end of file
+API_TB_STATUS= "/v1/customer/products/tb-status/"
+# Not documented, taken to mirror the fields of the products status
+API_SETTINGS_PATH = "/v1/customer/products/{device_id}/settings/"
+
+INSIGHTS_MAX_CONCURRENCY = 4
+
+# Update tiers, each polled by its own coordinator
+TIER_STATUS = "status"
+TIER_OUTDOOR = "outdoor"
+TIER_INSIGHTS = "insights"
+
+CONF_STATUS_INTERVAL = "status_interval"
+CONF_OUTDOOR_INTERVAL = "outdoor_interval"
+CONF_INSIGHTS_INTERVAL = "insights_interval"
+CONF_MIN_STATUS_INTERVAL = "min_status_interval"
+CONF_MAX_STATUS_INTERVAL = "max_status_interval"
+DEFAULT_STATUS_INTERVAL = 60  # seconds
+DEFAULT_MIN_STATUS_INTERVAL = 30
+DEFAULT_MAX_STATUS_INTERVAL = 300
+DEFAULT_OUTDOOR_INTERVAL = 600
+DEFAULT_INSIGHTS_INTERVAL = 900
+# Upper bound of a whole update cycle per tier, insights fan out over all devices
+TIER_TIMEOUTS = {TIER_STATUS: 30, TIER_OUTDOOR: 30, TIER_INSIGHTS: 120}  # seconds
+PROFILE_MAX_DURATION = 300  # seconds, a profile stops here even if its cycles didn't finish
+REFRESH_DEBOUNCE = 5  # seconds, refresh requests within this window share one poll
+WRITE_DEBOUNCE = 1.5  # seconds, setting changes within this window go out as one write
+
+# Target temperature range offered by the number entity, degrees Celsius
+TARGET_TEMPERATURE_MIN = 10
+TARGET_TEMPERATURE_MAX = 30
+TARGET_TEMPERATURE_STEP = 0.5
+
+CONF_DEVICES = "devices"  # device ids an entry exposes, empty for all
+CONF_CONTROLS = "controls"  # opt-in, the settings endpoint is not documented
+DEFAULT_CONTROLS = False
+
+CONF_BACKFILL_DAYS = "backfill_days"
+DEFAULT_BACKFILL_DAYS = 7
+BACKFILL_MAX_CONCURRENCY = 3
+
+CONF_HISTORY_DAYS = "history_days"
+DEFAULT_HISTORY_DAYS = 400  # hourly insights kept for the week/month/year sensors
+
+# Derived metrics computed from the status tier
+COP_WINDOWS = {"15min": 900, "1h": 3600, "24h": 86400}  # seconds
+COP_WINDOW_BUCKETS = 60  # ring buffer slots per window
+MAX_SAMPLE_GAP = 900  # seconds, longer gaps are not integrated
+
+# Optional export of each status poll to a time-series sink
+CONF_EXPORT = "export"
+CONF_EXPORT_URL = "export_url"  # InfluxDB write URL, e.g. http://host:8086/api/v2/write?org=home&bucket=dewarmte
+CONF_EXPORT_TOKEN = "export_token"
+CONF_EXPORT_TOPIC = "export_topic"
+EXPORT_NONE = "none"
+EXPORT_INFLUXDB = "influxdb"
+EXPORT_MQTT = "mqtt"
+DEFAULT_EXPORT_TOPIC = "dewarmte"
+EXPORT_MEASUREMENT = "dewarmte"
+EXPORT_QUEUE_SIZE = 5000  # records, the oldest are dropped while the sink is down
+EXPORT_BATCH_SIZE = 500  # records per write
+EXPORT_FLUSH_DELAY = 10  # seconds records are buffered before a write
+EXPORT_TIMEOUT = 10  # seconds per write
+EXPORT_RETRY_MIN = 10  # seconds, doubled after each failed write
+EXPORT_RETRY_MAX = 300
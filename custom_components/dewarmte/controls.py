@@ -0,0 +1,137 @@
+import asyncio
+import logging
+from functools import partial
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.debounce import Debouncer
+
+from .const import DOMAIN, WRITE_DEBOUNCE
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class DeviceSettingsWriter:
+    """Coalesce setting changes per device into one API write.
+
+    Entities show the requested value right away. Changes of a device within
+    WRITE_DEBOUNCE go out as a single write, which is confirmed by a refresh
+    of the status tier. Written values are shown until a poll that started
+    after the write lands, a failed write falls back to the last known state.
+
+    The settings endpoint isn't documented, controls of a device are only
+    created once a GET showed that the endpoint exists for it.
+    """
+
+    def __init__(self, hass: HomeAssistant, client, status_coordinator):
+        self.hass = hass
+        self.client = client
+        self.status_coordinator = status_coordinator
+        self._pending = {}  # device_id -> {key: value} not sent yet
+        self._unconfirmed = {}  # device_id -> {key: value} sent, waiting for the status refresh
+        self._written_after = {}  # device_id -> status polls started before the last write
+        self._debouncers = {}
+        self._listeners = {}  # device_id -> callbacks of the device's control entities
+        self._has_settings = {}  # device_id -> whether its settings endpoint exists
+        self._probes = {}  # device_id -> task checking the endpoint
+
+    def value(self, device_id, key, default=None):
+        """Return the requested value of key while it isn't confirmed, default otherwise."""
+        for values in (self._pending, self._unconfirmed):
+            if key in values.get(device_id, ()):
+                return values[device_id][key]
+        return default
+
+    @callback
+    def async_add_listener(self, device_id, update_callback):
+        listeners = self._listeners.setdefault(device_id, [])
+        listeners.append(update_callback)
+        return lambda: listeners.remove(update_callback)
+
+    @callback
+    def _notify(self, device_id):
+        for update_callback in list(self._listeners.get(device_id, ())):
+            update_callback()
+
+    @callback
+    def has_settings(self, device_id):
+        """Return True if the device's settings endpoint exists, unknown devices are checked in the background."""
+        if device_id not in self._has_settings and device_id not in self._probes:
+            self._probes[device_id] = self.hass.async_create_background_task(
+                self._async_probe(device_id), f"{DOMAIN}_settings_probe"
+            )
+        return self._has_settings.get(device_id, False)
+
+    async def async_probe(self, device_ids):
+        """Check the settings endpoint of devices not checked yet."""
+        for device_id in device_ids:
+            self.has_settings(device_id)
+        probes = [self._probes[device_id] for device_id in device_ids if device_id in self._probes]
+        if probes:
+            await asyncio.gather(*probes)
+
+    async def _async_probe(self, device_id):
+        try:
+            found = await self.client.async_has_device_settings(device_id)
+        except Exception as err:
+            # Checked again when the device's entities are next looked at
+            _LOGGER.debug("Could not check the settings endpoint of device %s: %s", device_id, err)
+            return
+        finally:
+            del self._probes[device_id]
+        self._has_settings[device_id] = found
+        if not found:
+            _LOGGER.warning("Device %s has no settings endpoint, its controls are not created", device_id)
+
+    async def async_set(self, device_id, key, value):
+        """Queue a setting change, the write goes out after WRITE_DEBOUNCE."""
+        self._pending.setdefault(device_id, {})[key] = value
+        debouncer = self._debouncers.get(device_id)
+        if debouncer is None:
+            debouncer = self._debouncers[device_id] = Debouncer(
+                self.hass,
+                _LOGGER,
+                cooldown=WRITE_DEBOUNCE,
+                immediate=False,
+                function=partial(self._async_write, device_id),
+            )
+        await debouncer.async_call()
+
+    async def _async_write(self, device_id):
+        settings = self._pending.pop(device_id, None)
+        if not settings:
+            return
+        unconfirmed = self._unconfirmed.setdefault(device_id, {})
+        unconfirmed.update(settings)
+        # A poll already running may return the old values, only later ones confirm
+        self._written_after[device_id] = self.status_coordinator.polls_started
+        try:
+            await self.client.async_set_device_settings(device_id, settings)
+        except Exception as err:
+            _LOGGER.error("Failed to write %s to device %s: %s", settings, device_id, err)
+            for key in settings:
+                unconfirmed.pop(key, None)
+            self._notify(device_id)
+            return
+        await self.status_coordinator.async_request_refresh_for({device_id})
+
+    @callback
+    def async_status_updated(self):
+        """Status listener: fresh data replaces the values written before it."""
+        coordinator = self.status_coordinator
+        if not self._unconfirmed or not coordinator.last_update_success:
+            return
+        confirmed = [
+            device_id for device_id in self._unconfirmed
+            if coordinator.data_poll > self._written_after.get(device_id, 0)
+        ]
+        for device_id in confirmed:
+            del self._unconfirmed[device_id]
+            self._written_after.pop(device_id, None)
+            self._notify(device_id)
+
+    @callback
+    def async_shutdown(self):
+        for debouncer in self._debouncers.values():
+            debouncer.async_shutdown()
+        for probe in self._probes.values():
+            probe.cancel()
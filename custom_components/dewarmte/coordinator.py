@@ -1,47 +1,316 @@
 import asyncio
 import logging
+import time
 from datetime import timedelta
 
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.debounce import Debouncer
 from homeassistant.helpers.update_coordinator import (
     DataUpdateCoordinator,
     UpdateFailed,
 )
 
-from .dewarmte_api_client import DeWarmteAPIClient
-from .const import DOMAIN
+from .dewarmte_api_client import DeWarmteAPIClient, DeWarmteRateLimitError
+from .models import SECTIONS, DeviceInsights, DeviceSnapshot, parse_outdoor_temperature
+from .polling import AdaptivePollScheduler, devices_active
+from .profiling import no_phase
+from .const import (
+    DOMAIN,
+    INSIGHTS_MAX_CONCURRENCY,
+    DEFAULT_STATUS_INTERVAL,
+    DEFAULT_MIN_STATUS_INTERVAL,
+    DEFAULT_MAX_STATUS_INTERVAL,
+    DEFAULT_OUTDOOR_INTERVAL,
+    DEFAULT_INSIGHTS_INTERVAL,
+    REFRESH_DEBOUNCE,
+    TIER_TIMEOUTS,
+    TIER_STATUS,
+    TIER_OUTDOOR,
+    TIER_INSIGHTS,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
-UPDATE_INTERVAL = timedelta(minutes=1)  # Adjust as needed
 
-class DeWarmteUpdateCoordinator(DataUpdateCoordinator):
+def _diff(tier, old, new):
+    """Return the (device_id, target_api, key) entries that differ between two tier values.
+
+    Presence of a section is tracked under key None, entities use it for
+    availability. Tiers without devices (outdoor) live under (None, None, None).
+    Snapshots are immutable, so an unchanged device costs a single comparison.
+    """
+    section = SECTIONS.get(tier)
+    if section is None:
+        return set() if old == new else {(None, None, None)}
+    section_of, section_fields = section
+    old = old or {}
+    changed = set()
+    for device_id in old.keys() | new.keys():
+        before, after = section_of(old.get(device_id)), section_of(new.get(device_id))
+        if before == after:
+            continue
+        if (before is None) != (after is None):
+            changed.add((device_id, tier, None))
+        for key in section_fields:
+            if getattr(before, key, None) != getattr(after, key, None):
+                changed.add((device_id, tier, key))
+    return changed
+
 
-    def __init__(self, hass: HomeAssistant, client: DeWarmteAPIClient):
+class DeWarmteCoordinator(DataUpdateCoordinator):
+    """Common base of the update tiers."""
+
+    tier = None
+
+    def __init__(self, hass: HomeAssistant, client: DeWarmteAPIClient, update_interval, min_interval=None, max_interval=None):
         """Initialize the coordinator."""
         super().__init__(
             hass,
             _LOGGER,
-            name=DOMAIN,
-            update_interval=UPDATE_INTERVAL,
+            # Shared by the entries of an account, DeWarmteAccount owns the lifecycle
+            config_entry=None,
+            name=f"{DOMAIN}_{self.tier}",
+            update_interval=timedelta(seconds=update_interval),
+            # Bursts of refresh requests (service calls, update_entity) collapse into one poll
+            request_refresh_debouncer=Debouncer(hass, _LOGGER, cooldown=REFRESH_DEBOUNCE, immediate=False),
         )
         self.client = client
+        self._scheduler = AdaptivePollScheduler(update_interval, min_interval, max_interval)
+        # Jittered from the start so entries set up together don't poll in lockstep
+        self.update_interval = self._scheduler.on_success()
+        # True while data comes from the stored snapshot, not the API
+        self.restored = False
+        # Keys whose value changed in the update being dispatched, None means all
+        self.changed_keys = None
+        self._notified_success = True
+        # ProfileSession set by the profile service, None costs a single check per cycle
+        self.profiler = None
+        self._profiled_cycle = None
+        # Polls started so far, and the number of the poll the data comes from
+        self.polls_started = 0
+        self.data_poll = 0
+
+    def async_restore(self, data):
+        """Seed the coordinator with a stored snapshot before the first poll."""
+        self.data = data
+        self.restored = True
+
+    def _track_changes(self, data):
+        if self.restored:
+            # The restored attribute goes away, every entity has to write
+            self.changed_keys = None
+        else:
+            self.changed_keys = _diff(self.tier, self.data, data)
+
+    @callback
+    def async_set_updated_data(self, data):
+        self._track_changes(data)
+        self.restored = False
+        super().async_set_updated_data(data)
+
+    @callback
+    def async_update_listeners(self):
+        # A change in update success flips availability of every entity
+        if self.last_update_success != self._notified_success:
+            self._notified_success = self.last_update_success
+            self.changed_keys = None
+        session = self._profiled_cycle
+        if session is None:
+            super().async_update_listeners()
+        else:
+            self._profiled_cycle = None
+            with session.phase("fan_out"):
+                super().async_update_listeners()
+            session.finish_cycle(self.tier)
+        self.changed_keys = set()
+
+    async def async_request_refresh_for(self, device_ids=None):
+        """Request a debounced refresh, device_ids limits it where the tier can fetch per device."""
+        await self.async_request_refresh()
+
+    def has_changed(self, keys):
+        """Return True if any of keys changed in the current update."""
+        return self.changed_keys is None or not self.changed_keys.isdisjoint(keys)
+
+    async def _async_fetch(self):
+        """Return the raw API data of the tier."""
+        raise NotImplementedError
+
+    def _parse(self, raw):
+        """Project raw API data into the tier's snapshots."""
+        return raw
+
+    def _is_active(self, data):
+        """Return whether the devices are active, None if the tier can't tell."""
+        return None
 
     async def _async_update_data(self):
         """Fetch data from API endpoint."""
+        start = time.monotonic()
+        self.polls_started += 1
+        poll = self.polls_started
+        phase = no_phase
+        if self.profiler is not None:
+            # The cycle ends with the fan-out in async_update_listeners
+            self._profiled_cycle = self.profiler
+            self.profiler.start_cycle()
+            phase = self.profiler.phase
         try:
-            async with asyncio.timeout(30):
+            async with asyncio.timeout(TIER_TIMEOUTS[self.tier]):
                 # Refresh token if needed
-                await self.client.async_ensure_authenticated()
+                with phase("auth"):
+                    await self.client.async_ensure_authenticated()
 
-                # Fetch and return structured device data
-                devices = await self.client.async_get_devices()
-                outdoor_temp = await self.client.async_get_outdoor_temp()
-
-                devices_return = {device["id"]: device for device in devices}
-                for device in devices_return.keys():
-                    devices_return[device]["outdoor_temp"] = outdoor_temp
-                    devices_return[device]["insights"] =  await self.client.async_get_insights(device)
-                return devices_return
+                with phase(f"fetch_{self.tier}"):
+                    raw = await self._async_fetch()
+            with phase(f"parse_{self.tier}"):
+                data = self._parse(raw)
         except Exception as err:
+            self.client.metrics.record_cycle(self.tier, time.monotonic() - start, success=False)
+            session = self._profiled_cycle
+            if session is not None:
+                # Consecutive failures skip the fan-out, so the cycle ends here
+                self._profiled_cycle = None
+                session.finish_cycle(self.tier)
+            retry_after = err.retry_after if isinstance(err, DeWarmteRateLimitError) else None
+            self.update_interval = self._scheduler.on_failure(retry_after)
             raise UpdateFailed(f"Error communicating with API: {err}") from err
+        self.client.metrics.record_cycle(self.tier, time.monotonic() - start)
+        self.update_interval = self._scheduler.on_success(self._is_active(data))
+        self._track_changes(data)
+        self.restored = False
+        self.data_poll = poll
+        return data
+
+
+class DeWarmteUpdateCoordinator(DeWarmteCoordinator):
+    """Fast tier: live device status from the products endpoint."""
+
+    tier = TIER_STATUS
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        client: DeWarmteAPIClient,
+        update_interval=DEFAULT_STATUS_INTERVAL,
+        min_interval=DEFAULT_MIN_STATUS_INTERVAL,
+        max_interval=DEFAULT_MAX_STATUS_INTERVAL,
+    ):
+        super().__init__(hass, client, update_interval, min_interval, max_interval)
+
+    async def _async_fetch(self):
+        return await self.client.async_get_devices()
+
+    def _parse(self, raw):
+        return {device["id"]: DeviceSnapshot.from_api(device) for device in raw}
+
+    def _is_active(self, data):
+        return devices_active(self.data or {}, data)
+
+
+class DeWarmteOutdoorCoordinator(DeWarmteCoordinator):
+    """Outdoor temperature from tb-status, shared by all devices of the account."""
+
+    tier = TIER_OUTDOOR
+
+    def __init__(self, hass: HomeAssistant, client: DeWarmteAPIClient, update_interval=DEFAULT_OUTDOOR_INTERVAL):
+        super().__init__(hass, client, update_interval)
+
+    async def _async_fetch(self):
+        return await self.client.async_get_outdoor_temp()
+
+    def _parse(self, raw):
+        return parse_outdoor_temperature(raw)
+
+
+class DeWarmteInsightsCoordinator(DeWarmteCoordinator):
+    """Slow tier: hourly insights per device known to the status coordinator."""
+
+    tier = TIER_INSIGHTS
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        client: DeWarmteAPIClient,
+        status_coordinator: DeWarmteUpdateCoordinator,
+        update_interval=DEFAULT_INSIGHTS_INTERVAL,
+        max_concurrency=INSIGHTS_MAX_CONCURRENCY,
+    ):
+        super().__init__(hass, client, update_interval)
+        self.status_coordinator = status_coordinator
+        self._insights_semaphore = asyncio.Semaphore(max_concurrency)
+        self._pending_devices = set()
+        self._device_refresh_debouncer = Debouncer(
+            hass, _LOGGER, cooldown=REFRESH_DEBOUNCE, immediate=False, function=self._async_refresh_devices
+        )
+
+    async def async_request_refresh_for(self, device_ids=None):
+        if device_ids is None:
+            await self.async_request_refresh()
+            return
+        self._pending_devices.update(device_ids)
+        await self._device_refresh_debouncer.async_call()
+
+    async def _async_refresh_devices(self):
+        """Fetch insights of the requested devices only and merge them into the data."""
+        pending, self._pending_devices = self._pending_devices, set()
+        device_ids = [device_id for device_id in self.status_coordinator.data or {} if device_id in pending]
+        if not device_ids or self.data is None:
+            return
+        try:
+            insights = await self._async_gather_insights(device_ids)
+        except DeWarmteRateLimitError as err:
+            # Left to the next tier-wide poll, which applies the backoff
+            _LOGGER.warning("Insights refresh of devices %s rate limited: %s", device_ids, err)
+            return
+        data = {**self.data, **self._parse(dict(zip(device_ids, insights)))}
+        # Not async_set_updated_data(): that cancels a pending tier-wide refresh and
+        # restarts the interval, so per-device refreshes would hold off the other devices
+        self._track_changes(data)
+        self.restored = False
+        self.data = data
+        self.async_update_listeners()
+
+    async def async_shutdown(self):
+        await super().async_shutdown()
+        self._device_refresh_debouncer.async_shutdown()
+
+    async def _async_get_device_insights(self, device_id):
+        """Fetch insights for one device, returning None if that device fails.
+
+        Rate limits apply to the whole account and are raised.
+        """
+        async with self._insights_semaphore:
+            try:
+                return await self.client.async_get_insights(device_id)
+            except DeWarmteRateLimitError:
+                raise
+            except Exception as err:
+                _LOGGER.warning("Failed to fetch insights for device %s: %s", device_id, err)
+                return None
+
+    async def _async_gather_insights(self, device_ids):
+        # Every fetch finishes before a rate limit is raised, none is left running
+        insights = await asyncio.gather(
+            *(self._async_get_device_insights(device_id) for device_id in device_ids),
+            return_exceptions=True,
+        )
+        for result in insights:
+            if isinstance(result, BaseException):
+                raise result
+        return insights
+
+    async def _async_fetch(self):
+        """Fetch insights for all devices concurrently."""
+        device_ids = list(self.status_coordinator.data or {})
+        insights = await self._async_gather_insights(device_ids)
+        if device_ids and all(values is None for values in insights):
+            # Nothing came back, fail the cycle so the scheduler backs off
+            raise RuntimeError(f"Insights of all {len(device_ids)} devices failed")
+        return dict(zip(device_ids, insights))
+
+    def _parse(self, raw):
+        return {
+            device_id: DeviceInsights.from_api(values) if values is not None else None
+            for device_id, values in raw.items()
+        }
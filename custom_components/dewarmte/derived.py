@@ -0,0 +1,218 @@
+import logging
+import time
+
+from homeassistant.util import dt as dt_util
+
+from .const import COP_WINDOWS, COP_WINDOW_BUCKETS, MAX_SAMPLE_GAP
+from .models import device_pairs
+
+_LOGGER = logging.getLogger(__name__)
+
+# Status fields that get today's min/max/mean
+RUNNING_STAT_KEYS = ("supply_temperature", "water_flow")
+
+# Below this much input energy (kWh) in a window the COP is meaningless
+MIN_COP_INPUT = 0.001
+
+
+class RollingWindow:
+    """Heat in and out over a sliding window, summed in a fixed ring of buckets.
+
+    Each sample lands in the bucket of its time slot, buckets that slide out
+    of the window are subtracted from the running sums, so an update costs
+    at most one pass over the ring and memory never grows.
+    """
+
+    __slots__ = ("bucket_seconds", "heat_in", "heat_out", "sum_in", "sum_out", "slot")
+
+    def __init__(self, window, buckets=COP_WINDOW_BUCKETS):
+        self.bucket_seconds = window / buckets
+        self.heat_in = [0.0] * buckets
+        self.heat_out = [0.0] * buckets
+        self.sum_in = 0.0
+        self.sum_out = 0.0
+        self.slot = None  # absolute index of the newest bucket
+
+    def _advance(self, slot):
+        if self.slot is None:
+            self.slot = slot
+            return
+        size = len(self.heat_in)
+        for step in range(1, min(slot - self.slot, size) + 1):
+            index = (self.slot + step) % size
+            self.sum_in -= self.heat_in[index]
+            self.sum_out -= self.heat_out[index]
+            self.heat_in[index] = self.heat_out[index] = 0.0
+        # Subtraction leaves float dust behind, an empty window sums to zero
+        self.sum_in = max(self.sum_in, 0.0)
+        self.sum_out = max(self.sum_out, 0.0)
+        self.slot = max(self.slot, slot)
+
+    def add(self, timestamp, heat_in, heat_out):
+        self._advance(int(timestamp // self.bucket_seconds))
+        # A sample from the past (clock step) counts for the newest bucket
+        index = self.slot % len(self.heat_in)
+        self.heat_in[index] += heat_in
+        self.heat_out[index] += heat_out
+        self.sum_in += heat_in
+        self.sum_out += heat_out
+
+    def cop(self, timestamp):
+        self._advance(int(timestamp // self.bucket_seconds))
+        if self.sum_in < MIN_COP_INPUT:
+            return None
+        return round(self.sum_out / self.sum_in, 2)
+
+    def as_dict(self):
+        return {"slot": self.slot, "heat_in": self.heat_in, "heat_out": self.heat_out}
+
+    def restore(self, stored):
+        if len(stored["heat_in"]) != len(self.heat_in):
+            return  # bucket count changed, start over
+        self.slot = stored["slot"]
+        self.heat_in = list(stored["heat_in"])
+        self.heat_out = list(stored["heat_out"])
+        self.sum_in = sum(self.heat_in)
+        self.sum_out = sum(self.heat_out)
+
+
+class RunningStats:
+    """Min, max and mean of the samples of the current local day."""
+
+    __slots__ = ("day", "min", "max", "total", "count")
+
+    def __init__(self):
+        self.day = None
+        self.min = self.max = None
+        self.total = 0.0
+        self.count = 0
+
+    def add(self, value, day):
+        if day != self.day:
+            self.__init__()
+            self.day = day
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.total += value
+        self.count += 1
+
+    def current(self, day):
+        """Return this object if it holds samples of day, None otherwise."""
+        return self if self.count and self.day == day else None
+
+    @property
+    def mean(self):
+        return round(self.total / self.count, 2) if self.count else None
+
+    def as_dict(self):
+        return {"day": self.day, "min": self.min, "max": self.max, "total": self.total, "count": self.count}
+
+    def restore(self, stored):
+        for key in self.__slots__:
+            setattr(self, key, stored[key])
+
+
+class DeviceMetrics:
+    """Derived metrics of one device, fed by its status snapshots."""
+
+    def __init__(self):
+        # kWh integrated from the heat_input/heat_output power readings (kW)
+        self.heat_input_energy = 0.0
+        self.heat_output_energy = 0.0
+        self.windows = {name: RollingWindow(seconds) for name, seconds in COP_WINDOWS.items()}
+        self.stats = {key: RunningStats() for key in RUNNING_STAT_KEYS}
+        self._last = None  # (timestamp, heat_input, heat_output) of the previous sample
+
+    def update(self, status, timestamp, day):
+        heat_input, heat_output = status.heat_input, status.heat_output
+        if heat_input is None or heat_output is None:
+            self._last = None
+        else:
+            if self._last is not None:
+                last_timestamp, last_input, last_output = self._last
+                elapsed = timestamp - last_timestamp
+                if 0 < elapsed <= MAX_SAMPLE_GAP:
+                    # Trapezoidal Riemann sum, kW * h
+                    energy_in = (last_input + heat_input) / 2 * elapsed / 3600
+                    energy_out = (last_output + heat_output) / 2 * elapsed / 3600
+                    self.heat_input_energy += energy_in
+                    self.heat_output_energy += energy_out
+                    for window in self.windows.values():
+                        window.add(timestamp, energy_in, energy_out)
+            self._last = (timestamp, heat_input, heat_output)
+
+        for key, stats in self.stats.items():
+            value = getattr(status, key)
+            if value is not None:
+                stats.add(value, day)
+
+    def cop(self, window):
+        return self.windows[window].cop(time.time())
+
+    def running(self, key):
+        """Return today's RunningStats of key, None before the first sample."""
+        return self.stats[key].current(dt_util.now().date().isoformat())
+
+    def as_dict(self):
+        return {
+            "heat_input_energy": self.heat_input_energy,
+            "heat_output_energy": self.heat_output_energy,
+            "windows": {name: window.as_dict() for name, window in self.windows.items()},
+            "stats": {key: stats.as_dict() for key, stats in self.stats.items()},
+            "last": self._last,
+        }
+
+    def restore(self, stored):
+        self.heat_input_energy = stored["heat_input_energy"]
+        self.heat_output_energy = stored["heat_output_energy"]
+        for name, window in stored["windows"].items():
+            if name in self.windows:
+                self.windows[name].restore(window)
+        for key, stats in stored["stats"].items():
+            if key in self.stats:
+                self.stats[key].restore(stats)
+        self._last = tuple(stored["last"]) if stored["last"] else None
+
+
+class DerivedMetrics:
+    """Derived metrics of all devices of an account."""
+
+    def __init__(self):
+        self.devices = {}
+        # Devices updated by the last status update, derived sensors only write for these
+        self.updated = set()
+        self._last_data = None
+
+    def get(self, device_id):
+        return self.devices.get(device_id)
+
+    def update(self, data):
+        """Feed a status tier update, the same data twice is only counted once."""
+        self.updated = set()
+        if data is None or data is self._last_data:
+            return False
+        self._last_data = data
+        timestamp = time.time()
+        day = dt_util.now().date().isoformat()
+        for device_id, device in data.items():
+            if device.status is None:
+                continue
+            metrics = self.devices.get(device_id)
+            if metrics is None:
+                metrics = self.devices[device_id] = DeviceMetrics()
+            metrics.update(device.status, timestamp, day)
+            self.updated.add(device_id)
+        return bool(self.updated)
+
+    def as_json(self):
+        return device_pairs(self.devices, DeviceMetrics.as_dict)
+
+    def restore(self, stored):
+        for device_id, values in stored or ():
+            metrics = DeviceMetrics()
+            try:
+                metrics.restore(values)
+            except (KeyError, TypeError, ValueError) as err:
+                _LOGGER.debug("Ignoring stored derived metrics of device %s: %s", device_id, err)
+                continue
+            self.devices[device_id] = metrics
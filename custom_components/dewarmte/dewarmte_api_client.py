@@ -1,13 +1,79 @@
 import aiohttp
+import base64
+import email.utils
+import json
 import logging
 import asyncio
+import time
 from datetime import datetime, timedelta, timezone
 from homeassistant.util import dt as dt_util
+from homeassistant.util.json import json_loads
 from custom_components.dewarmte.const import API_REFRESH_URL, TOKEN_REFRESH_MIN, API_TOKEN_URL, \
-    API_BASE_URL, API_PRODUCTS_PATH, API_TB_STATUS
+    API_BASE_URL, API_PRODUCTS_PATH, API_TB_STATUS, TOKEN_EXPIRY_MARGIN_SEC, TOKEN_PROACTIVE_REFRESH_SEC, \
+    API_RATE_LIMIT, API_RATE_BURST, API_MAX_IN_FLIGHT, JSON_EXECUTOR_THRESHOLD, API_SETTINGS_PATH
+from custom_components.dewarmte.insights import HourlyInsightsCache, project_insights
+from custom_components.dewarmte.metrics import ApiMetrics, endpoint_name
+from custom_components.dewarmte.session import AUTH_CLIENT_TIMEOUT, endpoint_timeout
+from custom_components.dewarmte.request_scheduler import RequestScheduler, PRIORITY_STATUS, PRIORITY_DEFAULT, \
+    PRIORITY_INSIGHTS
 
 _LOGGER = logging.getLogger(__name__)
 
+TOKEN_EXPIRY_MARGIN = timedelta(seconds=TOKEN_EXPIRY_MARGIN_SEC)
+TOKEN_PROACTIVE_REFRESH = timedelta(seconds=TOKEN_PROACTIVE_REFRESH_SEC)
+
+
+def _token_expiry(token):
+    """Read the expiry from the JWT exp claim, falling back to TOKEN_REFRESH_MIN."""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        claims = json.loads(base64.urlsafe_b64decode(payload))
+        return datetime.fromtimestamp(claims["exp"], tz=timezone.utc)
+    except (IndexError, KeyError, TypeError, ValueError):
+        _LOGGER.debug("Access token has no readable exp claim, assuming %s min", TOKEN_REFRESH_MIN)
+        return datetime.now(timezone.utc) + timedelta(minutes=TOKEN_REFRESH_MIN)
+
+
+def _decode_json(body, project=None):
+    if not body:
+        return None  # e.g. 204 after a write
+    data = json_loads(body)
+    return data if project is None else project(data)
+
+
+class DeWarmteRateLimitError(Exception):
+    """The API asked us to slow down (429/503), retry_after in seconds if given."""
+
+    def __init__(self, status, retry_after=None):
+        super().__init__(f"Rate limited by API: {status}, retry after {retry_after}s")
+        self.status = status
+        self.retry_after = retry_after
+
+
+def _parse_retry_after(value):
+    """Parse a Retry-After header given as seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0)
+
+
+def _raise_for_status(resp):
+    if resp.status in (429, 503):
+        raise DeWarmteRateLimitError(resp.status, _parse_retry_after(resp.headers.get("Retry-After")))
+    resp.raise_for_status()
+
+
 class DeWarmteAPIClient:
 
     TOKEN_URL = API_TOKEN_URL
@@ -20,6 +86,13 @@ class DeWarmteAPIClient:
         self._access_token = None
         self._refresh_token = None
         self._access_expires_at = None  # datetime
+        self._token_lock = asyncio.Lock()
+        self._refresh_task = None
+        self._token_listener = None
+        self._insights_cache = {}  # device_id -> HourlyInsightsCache
+        self.metrics = ApiMetrics()
+        self.profiler = None  # ProfileSession while the profile service runs
+        self._scheduler = RequestScheduler(API_RATE_LIMIT, API_RATE_BURST, API_MAX_IN_FLIGHT)
 
     async def authenticate(self):
         """Initial authentication using email and password."""
@@ -29,15 +102,15 @@ class DeWarmteAPIClient:
         }
         headers = {"Content-Type": "application/json"}
 
-        async with self._session.post(self.TOKEN_URL, json=payload, headers=headers) as resp:
+        async with self._session.post(self.TOKEN_URL, json=payload, headers=headers, timeout=AUTH_CLIENT_TIMEOUT) as resp:
             if resp.status != 200:
                 _LOGGER.error("Failed to authenticate: %s", resp.status)
                 raise Exception("Authentication failed")
 
-            data = await resp.json()
-            self._access_token = data["access"]
+            data = await resp.json(loads=json_loads)
+            self.metrics.reauthentications += 1
             self._refresh_token = data["refresh"]
-            self._access_expires_at = datetime.now(timezone.utc) + timedelta(minutes=TOKEN_REFRESH_MIN)
+            self._set_access_token(data["access"])
 
             _LOGGER.info("Authenticated: access token acquired")
 
@@ -50,55 +123,185 @@ class DeWarmteAPIClient:
         payload = {"refresh": self._refresh_token}
         headers = {"Content-Type": "application/json"}
 
-        async with self._session.post(self.REFRESH_URL, json=payload, headers=headers) as resp:
+        async with self._session.post(self.REFRESH_URL, json=payload, headers=headers, timeout=AUTH_CLIENT_TIMEOUT) as resp:
             if resp.status == 200:
-                data = await resp.json()
-                self._access_token = data["access"]
-                self._access_expires_at = datetime.now(timezone.utc) + timedelta(minutes=TOKEN_REFRESH_MIN)
+                data = await resp.json(loads=json_loads)
+                self.metrics.token_refreshes += 1
+                # The refresh token is rotated when the server is set up to do so
+                self._refresh_token = data.get("refresh", self._refresh_token)
+                self._set_access_token(data["access"])
                 _LOGGER.debug("Access token refreshed")
             else:
                 _LOGGER.warning("Failed to refresh access token: %s", resp.status)
                 await self.authenticate()
 
+    def _set_access_token(self, access_token):
+        """Store a new access token and schedule its proactive refresh."""
+        self._access_token = access_token
+        self._access_expires_at = _token_expiry(access_token)
+        self._schedule_proactive_refresh()
+        if self._token_listener is not None:
+            self._token_listener(self.tokens)
+
+    @property
+    def tokens(self):
+        """Return the current tokens for persisting."""
+        return {"access": self._access_token, "refresh": self._refresh_token}
+
+    def restore_tokens(self, tokens):
+        """Reuse persisted tokens, a rejected refresh token falls back to authenticate()."""
+        self._refresh_token = tokens.get("refresh")
+        if tokens.get("access"):
+            self._set_access_token(tokens["access"])
+
+    def set_token_listener(self, listener):
+        """Call listener with the tokens whenever they change."""
+        self._token_listener = listener
+
+    def _token_is_valid(self):
+        return (
+            self._access_token is not None
+            and self._access_expires_at is not None
+            and datetime.now(timezone.utc) < self._access_expires_at - TOKEN_EXPIRY_MARGIN
+        )
+
+    async def _refresh_single_flight(self, stale_token=None):
+        """Refresh the token once, however many callers ask for it concurrently.
+
+        Callers that queued behind an in-flight refresh find a fresh token
+        when they get the lock and return without another round-trip.
+        """
+        async with self._token_lock:
+            if stale_token is not None:
+                if self._access_token != stale_token:
+                    return
+            elif self._token_is_valid():
+                return
+            await self.refresh_access_token()
+
+    def _schedule_proactive_refresh(self):
+        """Refresh in the background shortly before the access token expires."""
+        current = asyncio.current_task()
+        if self._refresh_task is not None and self._refresh_task is not current:
+            self._refresh_task.cancel()
+
+        # Short-lived tokens are refreshed at half-life instead, and a floor
+        # keeps clock skew from turning this into a refresh loop
+        lifetime = (self._access_expires_at - datetime.now(timezone.utc)).total_seconds()
+        delay = max(lifetime - TOKEN_PROACTIVE_REFRESH.total_seconds(), lifetime / 2, 30)
+        self._refresh_task = asyncio.get_running_loop().create_task(
+            self._proactive_refresh(delay)
+        )
+
+    async def _proactive_refresh(self, delay):
+        await asyncio.sleep(delay)
+        try:
+            await self._refresh_single_flight(stale_token=self._access_token)
+        except Exception as err:
+            # The next request will retry on its own path
+            _LOGGER.warning("Background token refresh failed: %s", err)
+
+    async def async_close(self):
+        """Cancel the background token refresh."""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+
     async def async_ensure_authenticated(self):
         """Check and refresh access token if needed."""
         await self._ensure_valid_token()
 
     async def _ensure_valid_token(self):
         """Ensure access token is fresh."""
-        if not self._access_token or not self._access_expires_at or datetime.now(timezone.utc) >= self._access_expires_at:
+        if not self._token_is_valid():
             _LOGGER.debug("Access token expired or missing, refreshing...")
-            await self.refresh_access_token()
+            await self._refresh_single_flight()
+
+    async def _request(self, method, path, priority=PRIORITY_DEFAULT, project=None, **kwargs):
+        """Make an authenticated request through the request scheduler.
 
-    async def _request(self, method, path, **kwargs):
-        """Make an authenticated request with token refresh handling."""
+        project, if given, reduces the decoded response to what the caller
+        keeps, in the same step as decoding.
+        """
+        # Identical GETs in flight share one response
+        key = (method, path, project) if method == "GET" and not kwargs else None
+        return await self._scheduler.run(key, priority, lambda: self._send(method, path, project, **kwargs))
+
+    async def _send(self, method, path, project=None, **kwargs):
+        """Send an authenticated request with token refresh handling."""
         await self._ensure_valid_token()
 
         url = f"{self.BASE_URL}{path}"
+        used_token = self._access_token
         headers = kwargs.pop("headers", {})
-        headers["Authorization"] = f"Bearer {self._access_token}"
+        headers["Authorization"] = f"Bearer {used_token}"
         headers["Content-Type"] = "application/json"
         kwargs["headers"] = headers
+        # Each endpoint gets its own budget, a stalled insights call can't eat the status poll's
+        kwargs.setdefault("timeout", endpoint_timeout(endpoint_name(path)))
 
+        start = time.monotonic()
         async with self._session.request(method, url, **kwargs) as resp:
             if resp.status == 401:
+                self.metrics.record_request(path, resp.status, time.monotonic() - start, 0)
+                self.metrics.retries_401 += 1
                 _LOGGER.warning("401 Unauthorized, attempting token refresh...")
-                await self.refresh_access_token()
+                await self._refresh_single_flight(stale_token=used_token)
                 headers["Authorization"] = f"Bearer {self._access_token}"
+                start = time.monotonic()
                 async with self._session.request(method, url, **kwargs) as retry_resp:
-                    retry_resp.raise_for_status()
-                    return await retry_resp.json()
+                    return await self._read_response(path, retry_resp, start, project)
+
+            return await self._read_response(path, resp, start, project)
+
+    async def _read_response(self, path, resp, start, project=None):
+        """Check the status, decode the body and record the request in the metrics."""
+        body = b""
+        try:
+            _raise_for_status(resp)
+            body = await resp.read()
+        finally:
+            elapsed = time.monotonic() - start
+            self.metrics.record_request(path, resp.status, elapsed, len(body))
+            if self.profiler is not None:
+                self.profiler.add(f"request {endpoint_name(path)}", elapsed)
+        if self.profiler is not None:
+            with self.profiler.phase("decode"):
+                return await self._decode(body, project)
+        return await self._decode(body, project)
 
-            resp.raise_for_status()
-            return await resp.json()
+    @staticmethod
+    async def _decode(body, project):
+        """Decode with orjson, off the event loop for large bodies."""
+        if len(body) > JSON_EXECUTOR_THRESHOLD:
+            return await asyncio.get_running_loop().run_in_executor(None, _decode_json, body, project)
+        return _decode_json(body, project)
 
     async def async_get_devices(self):
-        products_resp = await self._request("GET", API_PRODUCTS_PATH)
+        products_resp = await self._request("GET", API_PRODUCTS_PATH, priority=PRIORITY_STATUS)
         if products_resp["count"] > 0:
             return products_resp["results"]
         else:
             return []
 
+    async def async_has_device_settings(self, device_id):
+        """Return True if the settings endpoint of a device exists, False if it answers 404."""
+        path = API_SETTINGS_PATH.format(device_id=device_id)
+        try:
+            await self._request("GET", path, priority=PRIORITY_STATUS)
+        except aiohttp.ClientResponseError as err:
+            # 405 still means the path exists, only without GET
+            if err.status == 404:
+                return False
+            if err.status != 405:
+                raise
+        return True
+
+    async def async_set_device_settings(self, device_id, settings):
+        """Write settings such as target_temperature or is_on to a device."""
+        path = API_SETTINGS_PATH.format(device_id=device_id)
+        return await self._request("PATCH", path, priority=PRIORITY_STATUS, json=settings)
+
     async def async_get_outdoor_temp(self):
         tb_status = await self._request("GET", API_TB_STATUS)
         if "outdoor_temperature" in tb_status.keys():
@@ -106,15 +309,29 @@ class DeWarmteAPIClient:
         else:
             return {}
 
+    async def async_get_hourly_insights(self, device_id, day, priority=PRIORITY_INSIGHTS):
+        """Return the hourly insights response starting at the given local day, see project_insights()."""
+        path = f"/v1/customer/products/{device_id}/insights/?start_date={day.strftime('%Y-%m-%d')}&timespan=hourly"
+        return await self._request("GET", path, priority=priority, project=project_insights)
+
+    @property
+    def scheduler(self):
+        return self._scheduler
+
+    def insights_cache(self, device_id):
+        """Return the hourly insights cache of a device, None before its first fetch."""
+        return self._insights_cache.get(device_id)
+
     async def async_get_insights(self, device_id):
         now_local = dt_util.now()
-        today_str = now_local.strftime('%Y-%m-%d')
-        path = f"/v1/customer/products/{device_id}/insights/?start_date={today_str}&timespan=hourly"
-        insights = await self._request("GET", path)
+        insights = await self.async_get_hourly_insights(device_id, now_local.date())
 
-        total_consumed = 0
-        for data_point in insights["data"]:
-            total_consumed += data_point["electricity_consumed"]
+        cache = self._insights_cache.setdefault(device_id, HourlyInsightsCache())
+        if self.profiler is not None:
+            with self.profiler.phase("aggregate_insights"):
+                total_consumed = cache.update(insights["data"], now_local)
+        else:
+            total_consumed = cache.update(insights["data"], now_local)
 
         values = dict()
         target_keys = ["heat_sum", "electricity_sum", "cop"]
@@ -0,0 +1,38 @@
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+from .models import snapshot_to_json
+
+TO_REDACT = {"username", "password", "access", "refresh", "export_url", "export_token"}
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry):
+    """Return request metrics and coordinator state of a config entry."""
+    data = hass.data[DOMAIN][entry.entry_id]
+    client = data["client"]
+
+    coordinators = {}
+    for tier, coordinator in data["coordinators"].items():
+        coordinators[tier] = {
+            "last_update_success": coordinator.last_update_success,
+            "update_interval": coordinator.update_interval.total_seconds() if coordinator.update_interval else None,
+            "restored": coordinator.restored,
+            "data": snapshot_to_json(tier, coordinator.data) if coordinator.data is not None else None,
+        }
+
+    # Coordinators only keep the fields entities use, the full payload is fetched here
+    try:
+        raw_devices = await client.async_get_devices()
+    except Exception as err:
+        raw_devices = f"Error fetching devices: {err}"
+
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "metrics": client.metrics.as_dict(),
+        "scheduler": client.scheduler.as_dict(),
+        "coordinators": coordinators,
+        "export": data["account"].exporter.as_dict() if data["account"].exporter is not None else None,
+        "raw_devices": async_redact_data(raw_devices, TO_REDACT),
+    }
@@ -0,0 +1,204 @@
+import logging
+from dataclasses import dataclass
+from operator import attrgetter
+from typing import Any, Callable
+
+from homeassistant.core import callback
+from homeassistant.helpers.device_registry import DeviceInfo
+from homeassistant.helpers.entity import EntityDescription
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from . import exposes_device
+from .const import DOMAIN
+from .models import SECTIONS
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@callback
+def async_track_device_entities(entry, entry_data, coordinator, entities_for, async_add_entities):
+    """Add entities now and whenever the status tier reports a new device or key.
+
+    entities_for(device_id, device) yields (key, factory) for every entity the
+    device should have, only factories of unseen keys are called. Entities of
+    devices that drop out of the status tier are marked stale until they return.
+    """
+    known = set()  # (device_id, key) of entities already added
+    entities = {}  # device_id -> entities
+    stale = set()
+
+    @callback
+    def _sync():
+        data = coordinator.data or {}
+        new_entities = []
+        for device_id, device in data.items():
+            if not exposes_device(entry_data, device_id):
+                continue
+            for key, factory in entities_for(device_id, device):
+                if (device_id, key) not in known:
+                    known.add((device_id, key))
+                    entity = factory()
+                    entities.setdefault(device_id, []).append(entity)
+                    new_entities.append(entity)
+        if new_entities:
+            _LOGGER.debug("Adding %d entities for new devices or keys", len(new_entities))
+            async_add_entities(new_entities)
+
+        gone = entities.keys() - data.keys()
+        for device_id in gone ^ stale:
+            is_stale = device_id in gone
+            _LOGGER.info("DeWarmte device %s %s", device_id, "is no longer reported" if is_stale else "is back")
+            for entity in entities[device_id]:
+                entity.async_set_stale(is_stale)
+        stale.clear()
+        stale.update(gone)
+
+    @callback
+    def _update():
+        # Only a changed status section can bring in a device or key
+        if coordinator.last_update_success and coordinator.changed_keys != set():
+            _sync()
+
+    _sync()
+    entry.async_on_unload(coordinator.async_add_listener(_update))
+
+
+def section_value(section, key):
+    """Return an accessor for attribute key of the device snapshot section."""
+    section_of = SECTIONS[section][0]
+    get = attrgetter(key)
+
+    def _value(data, device_id):
+        values = section_of(data.get(device_id))
+        return None if values is None else get(values)
+    return _value
+
+
+def section_available(section):
+    """Return an accessor telling whether the device has the section."""
+    section_of = SECTIONS[section][0]
+
+    def _available(data, device_id):
+        return section_of(data.get(device_id)) is not None
+    return _available
+
+
+def tier_value(data, device_id):
+    """Accessor for tiers whose data is a single value shared by all devices."""
+    return data
+
+
+def tier_available(data, device_id):
+    return data is not None
+
+
+@dataclass(frozen=True, kw_only=True)
+class DeWarmteEntityDescription(EntityDescription):
+    """Where an entity reads its value: the coordinator tier and the data section."""
+
+    tier: str
+    # None for tiers without per-device data (outdoor)
+    section: str | None
+    value_fn: Callable[[Any, Any], Any]
+    available_fn: Callable[[Any, Any], bool]
+
+
+class DeWarmteEntity(CoordinatorEntity):
+    """Base of the DeWarmte device entities.
+
+    Name, unique id and device info are set once, value and availability
+    come from the accessors of the entity description.
+    """
+
+    entity_description: DeWarmteEntityDescription
+
+    def __init__(self, coordinator, description, device_id, device_name, device_model):
+        super().__init__(coordinator)
+        self.entity_description = description
+        self.device_id = device_id
+
+        key = description.key
+        self._attr_name = f"{device_name} {key.replace('_', ' ').title()}"
+        self._attr_unique_id = f"{device_id}_{key}"
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, device_id)},
+            name=device_name,
+            manufacturer="DeWarmte",
+            model=device_model,
+            configuration_url="https://my.dewarmte.com",
+        )
+        # (device_id, target_api, key) entries of the coordinator diff this entity reads
+        if description.section is None:
+            self._change_keys = ((None, None, None),)
+        else:
+            self._change_keys = ((device_id, description.section, key), (device_id, description.section, None))
+        self._value_fn = description.value_fn
+        self._available_fn = description.available_fn
+        self._stale = False
+
+    @property
+    def _source(self):
+        """What the description accessors read."""
+        return self.coordinator.data
+
+    @property
+    def _value(self):
+        return self._value_fn(self._source, self.device_id)
+
+    @property
+    def available(self):
+        """Return True if entity is available."""
+        return super().available and not self._stale and self._available_fn(self._source, self.device_id)
+
+    @property
+    def extra_state_attributes(self):
+        """Flag values restored from storage until the first live update, and vanished devices."""
+        if self._stale:
+            return {"stale": True}
+        if self.coordinator.restored:
+            return {"restored": True}
+        return None
+
+    async def async_update(self):
+        """Handle homeassistant.update_entity, debounced and limited to this device."""
+        if self.enabled:
+            await self.coordinator.async_request_refresh_for({self.device_id})
+
+    @callback
+    def async_set_stale(self, stale):
+        """Mark the entity of a device the API stopped reporting."""
+        self._stale = stale
+        if self.hass is not None:
+            self.async_write_ha_state()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Only write state when our own value or availability changed."""
+        if self.coordinator.has_changed(self._change_keys):
+            super()._handle_coordinator_update()
+
+
+_UNSET = object()
+
+
+class DeWarmteControlEntity(DeWarmteEntity):
+    """Device entity that writes its key through the account's DeviceSettingsWriter."""
+
+    def __init__(self, coordinator, description, device_id, device_name, device_model, writer):
+        super().__init__(coordinator, description, device_id, device_name, device_model)
+        self.writer = writer
+
+    async def async_added_to_hass(self):
+        await super().async_added_to_hass()
+        # Written values being confirmed or rolled back
+        self.async_on_remove(self.writer.async_add_listener(self.device_id, self.async_write_ha_state))
+
+    @property
+    def _value(self):
+        value = self.writer.value(self.device_id, self.entity_description.key, _UNSET)
+        return super()._value if value is _UNSET else value
+
+    async def _async_write_value(self, value):
+        """Show value right away, the write itself is coalesced with other changes."""
+        await self.writer.async_set(self.device_id, self.entity_description.key, value)
+        self.async_write_ha_state()
@@ -0,0 +1,225 @@
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.event import async_call_later
+from homeassistant.util import dt as dt_util
+from homeassistant.util.json import json_dumps
+
+from .const import (
+    DOMAIN,
+    CONF_EXPORT,
+    CONF_EXPORT_URL,
+    CONF_EXPORT_TOKEN,
+    CONF_EXPORT_TOPIC,
+    DEFAULT_EXPORT_TOPIC,
+    EXPORT_INFLUXDB,
+    EXPORT_MQTT,
+    EXPORT_MEASUREMENT,
+    EXPORT_QUEUE_SIZE,
+    EXPORT_BATCH_SIZE,
+    EXPORT_FLUSH_DELAY,
+    EXPORT_TIMEOUT,
+    EXPORT_RETRY_MIN,
+    EXPORT_RETRY_MAX,
+    TIER_STATUS,
+    TIER_OUTDOOR,
+    TIER_INSIGHTS,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def device_fields(device, outdoor, insights):
+    """Return the exported fields of a device, values that are None are left out."""
+    fields = device.status.as_dict() if device.status is not None else {}
+    if outdoor is not None:
+        fields["outdoor_temperature"] = outdoor
+    if insights is not None:
+        fields.update((f"insights_{key}", value) for key, value in insights.as_dict().items())
+    return {key: value for key, value in fields.items() if value is not None}
+
+
+def _escape_tag(value):
+    return str(value).replace("\\", "\\\\").replace(",", "\\,").replace("=", "\\=").replace(" ", "\\ ")
+
+
+def _field_value(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        # Always floats, a reading that happens to be whole mustn't conflict with the field type
+        return repr(float(value)) if math.isfinite(value) else None
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+class InfluxDBSink:
+    """Writes records as InfluxDB line protocol, one POST per batch (v1 and v2 write API)."""
+
+    def __init__(self, hass: HomeAssistant, url, token=None):
+        # HA's general session, the DeWarmte one is sized and timed for the API
+        self.session = async_get_clientsession(hass)
+        self.url = url
+        self.headers = {"Content-Type": "text/plain; charset=utf-8"}
+        if token:
+            self.headers["Authorization"] = f"Token {token}"
+
+    def serialize(self, device, fields, timestamp_ns):
+        values = ",".join(
+            f"{_escape_tag(key)}={text}"
+            for key, text in ((key, _field_value(value)) for key, value in fields.items())
+            if text is not None
+        )
+        if not values:
+            return None
+        tags = f"device_id={_escape_tag(device.id)},nickname={_escape_tag(device.nickname)}"
+        if device.model:
+            tags += f",model={_escape_tag(device.model)}"
+        return f"{EXPORT_MEASUREMENT},{tags} {values} {timestamp_ns}"
+
+    async def async_write(self, batch):
+        async with self.session.post(self.url, data="\n".join(batch).encode(), headers=self.headers) as response:
+            if response.status >= 300:
+                raise RuntimeError(f"HTTP {response.status}: {(await response.text())[:200]}")
+
+
+class MqttSink:
+    """Publishes one JSON message per record to <topic>/<device_id> through the MQTT integration."""
+
+    def __init__(self, hass: HomeAssistant, topic):
+        self.hass = hass
+        self.topic = topic.rstrip("/")
+
+    def serialize(self, device, fields, timestamp_ns):
+        payload = {
+            "time": dt_util.utc_from_timestamp(timestamp_ns / 1e9).isoformat(),
+            "nickname": device.nickname,
+            **fields,
+        }
+        return f"{self.topic}/{device.id}", json_dumps(payload)
+
+    async def async_write(self, batch):
+        # Imported here, the integration only needs MQTT when this sink is configured
+        from homeassistant.components import mqtt
+
+        for topic, payload in batch:
+            await mqtt.async_publish(self.hass, topic, payload)
+
+
+class SnapshotExporter:
+    """Mirror every status poll of an account into a time-series sink.
+
+    The status listener serializes each device (status, the last outdoor
+    temperature and insights) once and appends it to a bounded queue, the
+    oldest records are dropped while the sink is down. Records are written
+    in batches after EXPORT_FLUSH_DELAY from a background task, a failed
+    batch is retried with backoff. Nothing in the poll loop waits on the sink.
+    """
+
+    def __init__(self, hass: HomeAssistant, sink, coordinators):
+        self.hass = hass
+        self.sink = sink
+        self.coordinators = coordinators
+        self._queue = deque(maxlen=EXPORT_QUEUE_SIZE)
+        self._retry_batch = None  # batch that failed, written before the queue
+        self._backoff = 0  # seconds, 0 while the sink works
+        self._flush_timer = None
+        self._flush_task = None
+        self._closed = False
+        self.sent = 0
+        self.dropped = 0
+        self.failures = 0
+
+    @callback
+    def async_export(self):
+        """Status listener: queue a record per device of a fresh poll."""
+        status = self.coordinators[TIER_STATUS]
+        if not status.last_update_success or status.restored or not status.data:
+            return
+        outdoor = self.coordinators[TIER_OUTDOOR]
+        outdoor = outdoor.data if outdoor.last_update_success else None
+        insights = self.coordinators[TIER_INSIGHTS].data or {}
+        timestamp_ns = time.time_ns()
+        for device_id, device in status.data.items():
+            fields = device_fields(device, outdoor, insights.get(device_id))
+            record = self.sink.serialize(device, fields, timestamp_ns) if fields else None
+            if record is None:
+                continue
+            if len(self._queue) == self._queue.maxlen:
+                self.dropped += 1
+            self._queue.append(record)
+        self._schedule(EXPORT_FLUSH_DELAY)
+
+    @callback
+    def _schedule(self, delay):
+        if self._closed or self._flush_timer is not None or self._flush_task is not None:
+            return
+        if self._queue or self._retry_batch:
+            self._flush_timer = async_call_later(self.hass, delay, self._async_start_flush)
+
+    @callback
+    def _async_start_flush(self, _now):
+        self._flush_timer = None
+        self._flush_task = self.hass.async_create_background_task(self._async_flush(), f"{DOMAIN}_export")
+
+    async def _async_flush(self):
+        try:
+            while self._retry_batch or self._queue:
+                batch = self._retry_batch or [
+                    self._queue.popleft() for _ in range(min(EXPORT_BATCH_SIZE, len(self._queue)))
+                ]
+                self._retry_batch = None
+                try:
+                    async with asyncio.timeout(EXPORT_TIMEOUT):
+                        await self.sink.async_write(batch)
+                except Exception as err:
+                    self._retry_batch = batch
+                    self.failures += 1
+                    log = _LOGGER.debug if self._backoff else _LOGGER.warning
+                    self._backoff = min(max(self._backoff * 2, EXPORT_RETRY_MIN), EXPORT_RETRY_MAX)
+                    log("Export of %s records failed, retrying in %s s: %s", len(batch), self._backoff, err)
+                    return
+                self.sent += len(batch)
+                if self._backoff:
+                    _LOGGER.info("Export recovered")
+                    self._backoff = 0
+        finally:
+            self._flush_task = None
+            self._schedule(self._backoff or EXPORT_FLUSH_DELAY)
+
+    @callback
+    def async_shutdown(self):
+        """Stop writing, records still queued are dropped."""
+        self._closed = True
+        if self._flush_timer is not None:
+            self._flush_timer()
+            self._flush_timer = None
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+
+    def as_dict(self):
+        return {
+            "sink": type(self.sink).__name__,
+            "queued": len(self._queue) + len(self._retry_batch or ()),
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "failures": self.failures,
+            "retry_in": self._backoff or None,
+        }
+
+
+@callback
+def async_create_exporter(hass: HomeAssistant, options, coordinators):
+    """Return the exporter configured in options, None when export is off."""
+    export = options.get(CONF_EXPORT)
+    if export == EXPORT_INFLUXDB and options.get(CONF_EXPORT_URL):
+        sink = InfluxDBSink(hass, options[CONF_EXPORT_URL], options.get(CONF_EXPORT_TOKEN))
+    elif export == EXPORT_MQTT:
+        sink = MqttSink(hass, options.get(CONF_EXPORT_TOPIC) or DEFAULT_EXPORT_TOPIC)
+    else:
+        return None
+    return SnapshotExporter(hass, sink, coordinators)
@@ -0,0 +1,261 @@
+import base64
+import logging
+import math
+from array import array
+from bisect import bisect_left
+from datetime import date, timedelta
+
+from homeassistant.core import callback
+from homeassistant.util import dt as dt_util
+
+from .const import DEFAULT_HISTORY_DAYS
+from .insights import BUCKET_ELECTRICITY, BUCKET_HEAT, BUCKET_COP
+from .models import device_pairs
+
+_LOGGER = logging.getLogger(__name__)
+
+PERIODS = ("day", "week", "month", "year")
+
+# Rollup slots
+_ELECTRICITY, _HEAT, _ELECTRICITY_WITH_HEAT, _COP_SUM, _COP_COUNT = range(5)
+
+# Drop expired hours in chunks, not on every append
+_TRIM_CHUNK = 24
+
+
+def period_start(period, day):
+    """Return the first local date of the period containing day."""
+    if period == "day":
+        return day
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    if period == "month":
+        return day.replace(day=1)
+    return day.replace(month=1, day=1)
+
+
+def _encode(column):
+    return base64.b64encode(column.tobytes()).decode()
+
+
+def _decode(typecode, value):
+    column = array(typecode)
+    column.frombytes(base64.b64decode(value))
+    return column
+
+
+class HourlySeries:
+    """Closed hourly insights of one device in array-backed columns, with rollups.
+
+    Hours are appended in time order, each append updates the day, week,
+    month and year rollup it falls in. Hours older than the retention are
+    dropped together with the rollups of periods that ended before them.
+    Missing values are stored as NaN. Rollups of periods starting on or
+    after covered_from hold every hour of the period so far.
+    """
+
+    def __init__(self, retention_days=DEFAULT_HISTORY_DAYS):
+        self.retention = retention_days * 86400
+        self.starts = array("q")  # UTC epoch seconds of the hour start
+        self.electricity = array("d")
+        self.heat = array("d")
+        self.cop = array("d")
+        self.rollups = {period: {} for period in PERIODS}  # period -> {first date: slots}
+        self.covered_from = None  # local date the hours were fetched from, None if unknown
+
+    def __len__(self):
+        return len(self.starts)
+
+    @property
+    def last_start(self):
+        return self.starts[-1] if self.starts else None
+
+    def add(self, start, data_point):
+        """Append a closed hour, returns False for hours that are already stored."""
+        timestamp = int(start.timestamp())
+        if self.starts and timestamp <= self.starts[-1]:
+            return False
+        electricity = _value(data_point.get(BUCKET_ELECTRICITY))
+        heat = _value(data_point.get(BUCKET_HEAT))
+        cop = _value(data_point.get(BUCKET_COP))
+        self.starts.append(timestamp)
+        self.electricity.append(electricity)
+        self.heat.append(heat)
+        self.cop.append(cop)
+        self._roll_up(dt_util.as_local(start).date(), electricity, heat, cop)
+        self._trim(timestamp - self.retention)
+        return True
+
+    def _roll_up(self, day, electricity, heat, cop):
+        for period in PERIODS:
+            key = period_start(period, day)
+            slots = self.rollups[period].get(key)
+            if slots is None:
+                slots = self.rollups[period][key] = [0.0, 0.0, 0.0, 0.0, 0]
+            if not math.isnan(electricity):
+                slots[_ELECTRICITY] += electricity
+                if not math.isnan(heat):
+                    slots[_ELECTRICITY_WITH_HEAT] += electricity
+            if not math.isnan(heat):
+                slots[_HEAT] += heat
+            if not math.isnan(cop):
+                slots[_COP_SUM] += cop
+                slots[_COP_COUNT] += 1
+
+    def _trim(self, cutoff):
+        expired = bisect_left(self.starts, cutoff)
+        if expired < _TRIM_CHUNK:
+            return
+        for column in (self.starts, self.electricity, self.heat, self.cop):
+            del column[:expired]
+        first_day = dt_util.as_local(dt_util.utc_from_timestamp(self.starts[0])).date()
+        for period, rollups in self.rollups.items():
+            current = period_start(period, first_day)
+            for key in [key for key in rollups if key < current]:
+                del rollups[key]
+
+    def total(self, period, metric, day=None):
+        """Return electricity or heat (kWh) of the period containing day, today by default."""
+        slots = self.rollups[period].get(period_start(period, day or dt_util.now().date()))
+        if slots is None:
+            return 0.0
+        return round(slots[_ELECTRICITY if metric == "electricity" else _HEAT], 3)
+
+    def cop_of(self, period, day=None):
+        """Return the COP of the period: heat over electricity where both are known, else the mean hourly COP."""
+        slots = self.rollups[period].get(period_start(period, day or dt_util.now().date()))
+        if slots is None:
+            return None
+        if slots[_ELECTRICITY_WITH_HEAT] > 0:
+            return round(slots[_HEAT] / slots[_ELECTRICITY_WITH_HEAT], 2)
+        if slots[_COP_COUNT]:
+            return round(slots[_COP_SUM] / slots[_COP_COUNT], 2)
+        return None
+
+    def as_dict(self):
+        return {
+            "starts": _encode(self.starts),
+            "electricity": _encode(self.electricity),
+            "heat": _encode(self.heat),
+            "cop": _encode(self.cop),
+            "covered_from": self.covered_from.isoformat() if self.covered_from else None,
+            # Kept, not rebuilt: a year can reach back past the retention
+            "rollups": {
+                period: [(key.isoformat(), slots) for key, slots in rollups.items()]
+                for period, rollups in self.rollups.items()
+            },
+        }
+
+    def restore(self, stored):
+        """Load stored columns and rollups."""
+        starts = _decode("q", stored["starts"])
+        columns = [_decode("d", stored[name]) for name in ("electricity", "heat", "cop")]
+        if any(len(column) != len(starts) for column in columns):
+            raise ValueError("stored columns differ in length")
+        self.starts = starts
+        self.electricity, self.heat, self.cop = columns
+        if stored.get("covered_from"):
+            self.covered_from = date.fromisoformat(stored["covered_from"])
+        for period, rollups in stored["rollups"].items():
+            if period in self.rollups:
+                self.rollups[period] = {date.fromisoformat(key): list(slots) for key, slots in rollups}
+        if self.starts:
+            # The retention may have been shortened
+            self._trim(self.starts[-1] - self.retention)
+
+
+def _value(value):
+    return math.nan if value is None else float(value)
+
+
+class InsightsHistory:
+    """Hourly insights history of all devices of an account."""
+
+    def __init__(self, retention_days=DEFAULT_HISTORY_DAYS):
+        self.retention_days = retention_days
+        self.devices = {}
+        # Devices that got new hours in the last update, their sensors write
+        self.updated = set()
+        # Devices whose history is filled up to the last closed hour, see InsightsBackfill
+        self.backfilled = set()
+        self._announce = set()  # backfilled since the last update, their sensors become available
+
+    def get(self, device_id):
+        return self.devices.get(device_id)
+
+    def covers(self, device_id, period):
+        """Return True if the device's history holds every closed hour of the current period."""
+        series = self.devices.get(device_id)
+        return (
+            device_id in self.backfilled
+            and series is not None
+            and series.covered_from is not None
+            and series.covered_from <= period_start(period, dt_util.now().date())
+        )
+
+    def first_day(self):
+        """Return the first day the history is fetched from: this year's start or the retention."""
+        today = dt_util.now().date()
+        return min(today.replace(month=1, day=1), today - timedelta(days=self.retention_days))
+
+    def _reaches_back(self, series):
+        return series is not None and series.covered_from is not None and series.covered_from <= self.first_day()
+
+    def _series_for_backfill(self, device_id):
+        """Return the device's series, started over if it doesn't reach back to first_day()."""
+        series = self.devices.get(device_id)
+        if not self._reaches_back(series):
+            series = self.devices[device_id] = HourlySeries(self.retention_days)
+            series.covered_from = self.first_day()
+        return series
+
+    def first_missing_hour(self, device_id):
+        """Return the start of the first hour the history lacks, the stored history is the checkpoint."""
+        series = self.devices.get(device_id)
+        if not self._reaches_back(series):
+            return dt_util.start_of_local_day(self.first_day())
+        if series.last_start is None:
+            return dt_util.start_of_local_day(series.covered_from)
+        return dt_util.as_local(dt_util.utc_from_timestamp(series.last_start + 3600))
+
+    def add_buckets(self, device_id, device_name, buckets):
+        """Append (start, data_point) closed hours of a device, returns True if any were new."""
+        series = self._series_for_backfill(device_id)
+        added = False
+        for start, data_point in buckets:
+            added = series.add(start, data_point) or added
+        if added:
+            self.updated.add(device_id)
+        return added
+
+    @callback
+    def set_live(self, device_id, live):
+        """Mark the device caught up or behind.
+
+        A caught-up device's sensors become available with the next update,
+        those of a device that fell behind (a missed hour) with this one.
+        """
+        if live:
+            self.backfilled.add(device_id)
+            self._announce.add(device_id)
+        else:
+            self.backfilled.discard(device_id)
+            self.updated.add(device_id)
+
+    @callback
+    def begin_update(self):
+        """Start collecting the devices the next insights update changes."""
+        self.updated, self._announce = self._announce, set()
+
+    def as_json(self):
+        return device_pairs(self.devices, HourlySeries.as_dict)
+
+    def restore(self, stored):
+        for device_id, values in stored or ():
+            series = HourlySeries(self.retention_days)
+            try:
+                series.restore(values)
+            except (KeyError, TypeError, ValueError) as err:
+                _LOGGER.debug("Ignoring stored insights history of device %s: %s", device_id, err)
+                continue
+            self.devices[device_id] = series
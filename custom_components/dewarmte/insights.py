@@ -0,0 +1,137 @@
+import asyncio
+import logging
+from datetime import timedelta
+
+from homeassistant.util import dt as dt_util
+
+from .const import BACKFILL_MAX_CONCURRENCY
+from .request_scheduler import PRIORITY_BACKFILL
+
+_LOGGER = logging.getLogger(__name__)
+
+# A bucket is only treated as final a little after its hour has closed,
+# the API may still adjust it right at the boundary.
+BUCKET_SETTLE = timedelta(minutes=5)
+
+# Fields of an hourly data point. Only electricity is always present, the
+# others are picked up when the API reports them.
+BUCKET_ELECTRICITY = "electricity_consumed"
+BUCKET_HEAT = "heat_produced"
+BUCKET_COP = "cop"
+BUCKET_FIELDS = (BUCKET_ELECTRICITY, BUCKET_HEAT, BUCKET_COP)
+
+# Day totals of an insights response
+INSIGHTS_TOTALS = ("heat_sum", "electricity_sum", "cop")
+
+
+def project_insights(response):
+    """Reduce an insights response to the day totals and the bucket fields we aggregate."""
+    projected = {key: response.get(key) for key in INSIGHTS_TOTALS}
+    projected["data"] = [
+        {key: data_point[key] for key in BUCKET_FIELDS if key in data_point}
+        for data_point in response.get("data") or ()
+    ]
+    return projected
+
+
+def bucket_start(day_start, hour):
+    """Return the start of bucket `hour` of the day starting at day_start, DST-aware."""
+    # Step in UTC so days with 23 or 25 hours map correctly
+    return dt_util.as_local(dt_util.as_utc(day_start) + timedelta(hours=hour))
+
+
+def is_closed(day_start, hour, now):
+    """Return True once the bucket has closed and settled."""
+    return bucket_start(day_start, hour + 1) + BUCKET_SETTLE <= now
+
+
+def hour_is_closed(start, now):
+    """Return True once the bucket starting at start has closed and settled."""
+    return dt_util.as_utc(start) + timedelta(hours=1) + BUCKET_SETTLE <= now
+
+
+def closed_buckets(data_points, day_start, now=None):
+    """Yield (start, data_point) for the closed buckets of one local day."""
+    now = now or dt_util.now()
+    next_day = dt_util.start_of_local_day((day_start + timedelta(days=1)).date())
+    for hour, data_point in enumerate(data_points):
+        start = bucket_start(day_start, hour)
+        # A response may run past the requested day, stop at the next midnight
+        if start >= next_day or not is_closed(day_start, hour, now):
+            return
+        yield start, data_point
+
+
+async def async_fetch_closed_days(client, device_id, days):
+    """Yield (day, closed buckets) of past local days in order, a few days fetched at a time."""
+    for i in range(0, len(days), BACKFILL_MAX_CONCURRENCY):
+        window = days[i:i + BACKFILL_MAX_CONCURRENCY]
+        responses = await asyncio.gather(
+            *(client.async_get_hourly_insights(device_id, day, priority=PRIORITY_BACKFILL) for day in window),
+            return_exceptions=True,
+        )
+        for response in responses:
+            if isinstance(response, BaseException):
+                raise response
+        for day, response in zip(window, responses):
+            yield day, list(closed_buckets(response["data"], dt_util.start_of_local_day(day)))
+
+
+class HourlyInsightsCache:
+    """Completed hourly insights buckets of one device for the current local day.
+
+    Buckets are keyed by (date, hour index since local midnight). Completed
+    buckets are summed once and kept, only the still-open hour is re-read on
+    each update, so the daily total is a running sum instead of a re-sum.
+    """
+
+    def __init__(self):
+        self._day_start = None  # aware datetime of local midnight
+        self._completed = {}  # (date, hour) -> data point
+        self._completed_total = 0
+        self._open_value = 0
+
+    @property
+    def daily_consumed_electricity(self):
+        """Return the consumed electricity since local midnight."""
+        return self._completed_total + self._open_value
+
+    def _reset(self, day_start):
+        self._day_start = day_start
+        self._completed = {}
+        self._completed_total = 0
+        self._open_value = 0
+
+    def completed_buckets(self):
+        """Return (start, data_point) of today's completed buckets, oldest first."""
+        return [
+            (bucket_start(self._day_start, hour), data_point)
+            for (_, hour), data_point in sorted(self._completed.items())
+        ]
+
+    def update(self, data_points, now=None):
+        """Merge today's hourly data points and return the running total."""
+        now = now or dt_util.now()
+        day_start = dt_util.start_of_local_day(now)
+
+        # Midnight rollover or a timezone change both move local midnight
+        if day_start != self._day_start:
+            _LOGGER.debug("Insights cache rolled over to %s", day_start)
+            self._reset(day_start)
+
+        # Fewer buckets than we already closed means the API rewrote the day
+        if len(data_points) < len(self._completed):
+            self._reset(day_start)
+
+        day = day_start.date()
+        self._open_value = 0
+        for hour in range(len(self._completed), len(data_points)):
+            data_point = data_points[hour]
+            value = data_point[BUCKET_ELECTRICITY] or 0
+            if hour == len(self._completed) and is_closed(day_start, hour, now):
+                self._completed[(day, hour)] = data_point
+                self._completed_total += value
+            else:
+                self._open_value += value
+
+        return self.daily_consumed_electricity
@@ -0,0 +1,114 @@
+import re
+import time
+from collections import Counter, deque
+
+# Upper bounds in milliseconds, anything slower lands in the overflow bucket
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_DEVICE_SEGMENT = re.compile(r"/products/(?!tb-status/)[^/]+/")
+
+
+def endpoint_name(path):
+    """Collapse a request path into its endpoint, e.g. /v1/customer/products/{id}/insights/."""
+    return _DEVICE_SEGMENT.sub("/products/{id}/", path.split("?", 1)[0])
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram."""
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_ms = None
+
+    def observe(self, seconds):
+        ms = seconds * 1000
+        index = 0
+        while index < len(LATENCY_BUCKETS_MS) and ms > LATENCY_BUCKETS_MS[index]:
+            index += 1
+        self.buckets[index] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self.last_ms = ms
+
+    def as_dict(self):
+        labels = [f"<={bound}ms" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 1) if self.count else None,
+            "max_ms": round(self.max_ms, 1),
+            "last_ms": round(self.last_ms, 1) if self.last_ms is not None else None,
+            "buckets": dict(zip(labels, self.buckets)),
+        }
+
+
+class EndpointMetrics:
+    """Latency, status codes and response sizes of one endpoint."""
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.status_codes = Counter()
+        self.bytes = 0
+
+    def as_dict(self):
+        return {
+            "latency": self.latency.as_dict(),
+            "status_codes": dict(self.status_codes),
+            "bytes": self.bytes,
+            "mean_bytes": round(self.bytes / self.latency.count) if self.latency.count else None,
+        }
+
+
+class ApiMetrics:
+    """Request and poll-cycle metrics of one API client."""
+
+    def __init__(self):
+        self.endpoints = {}
+        self.cycles = {}  # tier -> LatencyHistogram
+        self.cycle_failures = Counter()
+        self.retries_401 = 0
+        self.token_refreshes = 0
+        self.reauthentications = 0
+        self._calls = deque()  # monotonic timestamps of the last hour
+
+    def record_request(self, path, status, seconds, size):
+        endpoint = self.endpoints.get(name := endpoint_name(path))
+        if endpoint is None:
+            endpoint = self.endpoints[name] = EndpointMetrics()
+        endpoint.latency.observe(seconds)
+        endpoint.status_codes[status] += 1
+        endpoint.bytes += size
+        self._calls.append(time.monotonic())
+
+    def record_cycle(self, tier, seconds, success=True):
+        histogram = self.cycles.get(tier)
+        if histogram is None:
+            histogram = self.cycles[tier] = LatencyHistogram()
+        histogram.observe(seconds)
+        if not success:
+            self.cycle_failures[tier] += 1
+
+    def last_cycle_ms(self, tier):
+        histogram = self.cycles.get(tier)
+        return round(histogram.last_ms) if histogram and histogram.last_ms is not None else None
+
+    @property
+    def calls_last_hour(self):
+        cutoff = time.monotonic() - 3600
+        while self._calls and self._calls[0] < cutoff:
+            self._calls.popleft()
+        return len(self._calls)
+
+    def as_dict(self):
+        return {
+            "calls_last_hour": self.calls_last_hour,
+            "retries_401": self.retries_401,
+            "token_refreshes": self.token_refreshes,
+            "reauthentications": self.reauthentications,
+            "endpoints": {name: endpoint.as_dict() for name, endpoint in self.endpoints.items()},
+            "cycles": {tier: histogram.as_dict() for tier, histogram in self.cycles.items()},
+            "cycle_failures": dict(self.cycle_failures),
+        }
@@ -0,0 +1,127 @@
+from dataclasses import dataclass, fields
+
+from .const import TIER_STATUS, TIER_INSIGHTS
+
+
+@dataclass(frozen=True, slots=True)
+class DeviceStatus:
+    """Status fields of a device that entities and the poll scheduler read."""
+
+    supply_temperature: float | None = None
+    target_temperature: float | None = None
+    actual_temperature: float | None = None
+    heat_input: float | None = None
+    heat_output: float | None = None
+    water_flow: float | None = None
+    electricity_consumption: float | None = None
+    is_on: bool | None = None
+    gas_boiler: bool | None = None
+    is_connected: bool | None = None
+    thermostat: bool | None = None
+
+    @classmethod
+    def from_api(cls, status):
+        return cls(*(status.get(name) for name in STATUS_FIELDS))
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in STATUS_FIELDS}
+
+
+@dataclass(frozen=True, slots=True)
+class DeviceSnapshot:
+    """One device of the products endpoint, without the fields nothing reads."""
+
+    id: int | str
+    nickname: str
+    model: str | None
+    status: DeviceStatus | None
+
+    @classmethod
+    def from_api(cls, device):
+        status = device.get("status")
+        return cls(
+            id=device["id"],
+            nickname=device.get("nickname", device["id"]),
+            model=device.get("type"),
+            status=DeviceStatus.from_api(status) if status is not None else None,
+        )
+
+    def as_dict(self):
+        """Return the device in the shape of the API, from_api() reads it back."""
+        return {
+            "id": self.id,
+            "nickname": self.nickname,
+            "type": self.model,
+            "status": self.status.as_dict() if self.status is not None else None,
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class DeviceInsights:
+    """Aggregated insights of a device for the current day."""
+
+    heat_sum: float | None = None
+    electricity_sum: float | None = None
+    cop: float | None = None
+    daily_consumed_electricity: float | None = None
+
+    @classmethod
+    def from_api(cls, values):
+        return cls(*(values.get(name) for name in INSIGHTS_FIELDS))
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in INSIGHTS_FIELDS}
+
+
+STATUS_FIELDS = tuple(field.name for field in fields(DeviceStatus))
+INSIGHTS_FIELDS = tuple(field.name for field in fields(DeviceInsights))
+
+
+def status_of(device):
+    return None if device is None else device.status
+
+
+def insights_of(device):
+    return device
+
+
+# Per-device tier -> (coordinator value -> section read by entities, section fields)
+SECTIONS = {
+    TIER_STATUS: (status_of, STATUS_FIELDS),
+    TIER_INSIGHTS: (insights_of, INSIGHTS_FIELDS),
+}
+
+
+def parse_outdoor_temperature(value):
+    return value if isinstance(value, (int, float)) else None
+
+
+def device_pairs(devices, to_json):
+    """Return {device_id: value} as stored, as (device_id, to_json(value)) pairs.
+
+    JSON object keys are always strings, pairs keep device ids as they are.
+    """
+    return [(device_id, to_json(value)) for device_id, value in devices.items()]
+
+
+def snapshot_to_json(tier, data):
+    """Return tier data as stored, see device_pairs()."""
+    if tier == TIER_STATUS:
+        return device_pairs(data, DeviceSnapshot.as_dict)
+    if tier == TIER_INSIGHTS:
+        return device_pairs(
+            data, lambda insights: {TIER_INSIGHTS: insights.as_dict() if insights is not None else None}
+        )
+    return data
+
+
+def snapshot_from_json(tier, stored):
+    """Inverse of snapshot_to_json()."""
+    if tier == TIER_STATUS:
+        return {device_id: DeviceSnapshot.from_api(device) for device_id, device in stored}
+    if tier == TIER_INSIGHTS:
+        return {
+            device_id: DeviceInsights.from_api(values[TIER_INSIGHTS]) if values.get(TIER_INSIGHTS) is not None else None
+            for device_id, values in stored
+        }
+    return parse_outdoor_temperature(stored)
@@ -0,0 +1,95 @@
+import logging
+from dataclasses import dataclass
+from functools import partial
+
+from homeassistant.components.number import (
+    NumberDeviceClass,
+    NumberEntity,
+    NumberEntityDescription,
+    NumberMode,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import UnitOfTemperature
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from . import exposes_device
+from .entity import (
+    DeWarmteControlEntity,
+    DeWarmteEntityDescription,
+    async_track_device_entities,
+    section_available,
+    section_value,
+)
+from .const import (
+    DOMAIN,
+    TIER_STATUS,
+    TARGET_TEMPERATURE_MIN,
+    TARGET_TEMPERATURE_MAX,
+    TARGET_TEMPERATURE_STEP,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, kw_only=True)
+class DeWarmteNumberEntityDescription(DeWarmteEntityDescription, NumberEntityDescription):
+    """Describes a writable DeWarmte device setting."""
+
+
+NUMBERS = (
+    DeWarmteNumberEntityDescription(
+        key="target_temperature",
+        tier=TIER_STATUS,
+        section=TIER_STATUS,
+        value_fn=section_value(TIER_STATUS, "target_temperature"),
+        available_fn=section_available(TIER_STATUS),
+        device_class=NumberDeviceClass.TEMPERATURE,
+        native_unit_of_measurement=UnitOfTemperature.CELSIUS,
+        native_min_value=TARGET_TEMPERATURE_MIN,
+        native_max_value=TARGET_TEMPERATURE_MAX,
+        native_step=TARGET_TEMPERATURE_STEP,
+        mode=NumberMode.BOX,
+    ),
+)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up DeWarmte number entities from config entry."""
+    entry_data = hass.data[DOMAIN][entry.entry_id]
+    coordinator = entry_data["coordinators"][TIER_STATUS]
+    writer = entry_data["account"].writer
+
+    def _device_entities(device_id, device):
+        status = device.status
+        # Devices found later are checked in the background, their controls come with a later update
+        if status is None or not writer.has_settings(device_id):
+            return
+        for description in NUMBERS:
+            if getattr(status, description.key) is not None:
+                yield description.key, partial(
+                    DeWarmteNumber, coordinator, description, device_id, device.nickname, device.model, writer
+                )
+
+    # The settings endpoint is guessed, controls are only created where it exists
+    await writer.async_probe(
+        [device_id for device_id in coordinator.data or {} if exposes_device(entry_data, device_id)]
+    )
+    async_track_device_entities(entry, entry_data, coordinator, _device_entities, async_add_entities)
+
+
+class DeWarmteNumber(DeWarmteControlEntity, NumberEntity):
+    """Writable number setting of a DeWarmte device."""
+
+    entity_description: DeWarmteNumberEntityDescription
+
+    @property
+    def native_value(self):
+        return self._value
+
+    async def async_set_native_value(self, value: float) -> None:
+        await self._async_write_value(value)
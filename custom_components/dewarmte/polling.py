@@ -0,0 +1,82 @@
+import logging
+import random
+from datetime import timedelta
+
+_LOGGER = logging.getLogger(__name__)
+
+# Consecutive idle, steady polls before stretching to the max interval
+IDLE_POLLS_BEFORE_SLOWDOWN = 5
+# Temperature change (degrees) between polls that counts as "moving"
+TEMPERATURE_DELTA = 0.5
+# Relative jitter on every interval, keeps several entries from lining up
+INTERVAL_JITTER = 0.1
+MAX_BACKOFF = 1800  # seconds
+
+ACTIVE_KEYS = ("is_on", "thermostat")
+TEMPERATURE_KEYS = ("supply_temperature", "actual_temperature", "target_temperature")
+
+
+def devices_active(previous, current):
+    """Return True if any device is running or its temperatures are moving."""
+    for device_id, device in current.items():
+        status = device.status
+        if status is None:
+            continue
+        if any(getattr(status, key) for key in ACTIVE_KEYS):
+            return True
+        old_device = previous.get(device_id)
+        old_status = old_device.status if old_device is not None else None
+        if old_status is None:
+            continue
+        for key in TEMPERATURE_KEYS:
+            new, old = getattr(status, key), getattr(old_status, key)
+            if new is not None and old is not None and abs(new - old) >= TEMPERATURE_DELTA:
+                return True
+    return False
+
+
+class AdaptivePollScheduler:
+    """Pick the next poll interval from activity and failures.
+
+    Active devices poll at min_interval, devices that stayed idle and steady
+    for a while at max_interval, anything else at the base interval. Failures
+    back off exponentially with full jitter, never shorter than Retry-After.
+    """
+
+    def __init__(self, base_interval, min_interval=None, max_interval=None):
+        self.base_interval = base_interval
+        self.min_interval = min_interval or base_interval
+        self.max_interval = max_interval or base_interval
+        self._idle_polls = 0
+        self._failures = 0
+
+    def _jitter(self, seconds):
+        return timedelta(seconds=seconds * random.uniform(1 - INTERVAL_JITTER, 1 + INTERVAL_JITTER))
+
+    def on_success(self, active=None):
+        """Return the interval after a successful poll, active=None means unknown."""
+        self._failures = 0
+        if active:
+            self._idle_polls = 0
+            seconds = self.min_interval
+        elif active is None:
+            seconds = self.base_interval
+        else:
+            self._idle_polls += 1
+            if self._idle_polls >= IDLE_POLLS_BEFORE_SLOWDOWN:
+                seconds = self.max_interval
+            else:
+                seconds = self.base_interval
+        return self._jitter(seconds)
+
+    def on_failure(self, retry_after=None):
+        """Return the interval after a failed poll."""
+        self._failures += 1
+        cap = max(MAX_BACKOFF, self.max_interval)
+        backoff = min(self.base_interval * 2 ** (self._failures - 1), cap)
+        # Full jitter, but never sooner than the base interval
+        seconds = random.uniform(self.base_interval, max(backoff, self.base_interval))
+        if retry_after is not None:
+            seconds = max(seconds, retry_after)
+        _LOGGER.debug("Poll failed %s time(s), next attempt in %.0fs", self._failures, seconds)
+        return timedelta(seconds=seconds)
@@ -0,0 +1,150 @@
+import asyncio
+import cProfile
+import io
+import logging
+import pstats
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.util import dt as dt_util
+
+from .const import PROFILE_MAX_DURATION
+
+_LOGGER = logging.getLogger(__name__)
+
+# Returned by no_phase(), so callers without a profiler don't allocate anything
+_NO_PHASE = nullcontext()
+
+
+def no_phase(name):
+    return _NO_PHASE
+
+
+class ProfileSession:
+    """cProfile and per-phase timings over the next few coordinator cycles of an account.
+
+    Cycles of all tiers count towards the total, failed ones included. The
+    profiler runs from the start of the first one until the last one has
+    finished, or for at most max_duration seconds.
+    """
+
+    def __init__(self, cycles, on_done, max_duration=PROFILE_MAX_DURATION):
+        self.cycles = cycles
+        self.completed = Counter()  # tier -> finished cycles
+        self.phases = defaultdict(float)  # phase -> seconds
+        self.calls = Counter()
+        self._on_done = on_done
+        self._profile = cProfile.Profile()
+        self._started = None
+        self._finished = None
+        self._max_duration = max_duration
+        self._timeout = None
+
+    @property
+    def done(self):
+        return self._finished is not None
+
+    def start_cycle(self):
+        if self._started is None:
+            self._started = time.perf_counter()
+            # cProfile hooks the whole event loop, it must not outlive a stalled API
+            self._timeout = asyncio.get_running_loop().call_later(self._max_duration, self._stop)
+            try:
+                self._profile.enable()
+            except ValueError as err:
+                # Another profiler (e.g. the profiler integration) owns the hook
+                _LOGGER.warning("cProfile unavailable, only phase timings are collected: %s", err)
+                self._profile = None
+
+    def finish_cycle(self, tier):
+        self.completed[tier] += 1
+        if sum(self.completed.values()) >= self.cycles:
+            self._stop()
+
+    def _stop(self):
+        if self.done:
+            return
+        if self._timeout is not None:
+            self._timeout.cancel()
+        if self._profile is not None:
+            self._profile.disable()
+        self._finished = time.perf_counter()
+        if sum(self.completed.values()) < self.cycles:
+            _LOGGER.warning(
+                "Profile stopped after %s s with %s of %s cycles",
+                self._max_duration, sum(self.completed.values()), self.cycles,
+            )
+        self._on_done(self)
+
+    def add(self, phase, seconds):
+        if self.done:
+            # A cycle still running when the time ran out, the summary is being written
+            return
+        self.phases[phase] += seconds
+        self.calls[phase] += 1
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def summary(self):
+        return {
+            "cycles": dict(self.completed),
+            "wall_s": round(self._finished - self._started, 3),
+            "phases": {
+                phase: {
+                    "calls": self.calls[phase],
+                    "total_ms": round(seconds * 1000, 1),
+                    "mean_ms": round(seconds * 1000 / self.calls[phase], 2),
+                }
+                for phase, seconds in sorted(self.phases.items(), key=lambda item: -item[1])
+            },
+        }
+
+    def write(self, path_prefix):
+        """Write <prefix>.prof (pstats, loads in snakeviz/flameprof) and <prefix>.txt."""
+        summary = self.summary()
+        lines = [f"DeWarmte profile, cycles {summary['cycles']}, wall {summary['wall_s']} s", ""]
+        lines.append(f"{'phase':<40} {'calls':>6} {'total ms':>10} {'mean ms':>9}")
+        for phase, values in summary["phases"].items():
+            lines.append(f"{phase:<40} {values['calls']:>6} {values['total_ms']:>10} {values['mean_ms']:>9}")
+        files = [f"{path_prefix}.txt"]
+        if self._profile is not None:
+            self._profile.dump_stats(f"{path_prefix}.prof")
+            files.append(f"{path_prefix}.prof")
+            stream = io.StringIO()
+            pstats.Stats(self._profile, stream=stream).sort_stats("cumulative").print_stats(40)
+            lines += ["", stream.getvalue()]
+        with open(f"{path_prefix}.txt", "w", encoding="utf-8") as file:
+            file.write("\n".join(lines))
+        return files
+
+
+@callback
+def async_profile_account(hass: HomeAssistant, account, cycles):
+    """Profile the next cycles of an account, results are written to the config dir."""
+    targets = [account.client, *account.coordinators.values()]
+    if any(target.profiler is not None for target in targets):
+        return False
+
+    @callback
+    def _done(session):
+        for target in targets:
+            target.profiler = None
+        prefix = hass.config.path(f"dewarmte_profile_{dt_util.now().strftime('%Y%m%d_%H%M%S')}")
+        hass.async_create_task(_async_write(session, prefix))
+
+    async def _async_write(session, prefix):
+        files = await hass.async_add_executor_job(session.write, prefix)
+        _LOGGER.info("DeWarmte profile of %s cycles written to %s", cycles, ", ".join(files))
+
+    session = ProfileSession(cycles, _done)
+    for target in targets:
+        target.profiler = session
+    return True
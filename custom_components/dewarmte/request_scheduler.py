@@ -0,0 +1,104 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+_LOGGER = logging.getLogger(__name__)
+
+# Lower runs first
+PRIORITY_STATUS = 0
+PRIORITY_DEFAULT = 1
+PRIORITY_INSIGHTS = 2
+PRIORITY_BACKFILL = 3
+
+
+class TokenBucket:
+    """Token-bucket rate limit, rate in requests per second."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._last = time.monotonic()
+
+    def reserve(self):
+        """Take a token and return how long to wait before using it."""
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+        self._tokens -= 1
+        return 0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+class RequestScheduler:
+    """Admit API requests by priority under a rate limit and an in-flight cap.
+
+    Identical GETs already in flight are coalesced, later callers share the
+    response of the first one instead of sending their own.
+    """
+
+    def __init__(self, rate, burst, max_in_flight):
+        self._bucket = TokenBucket(rate, burst)
+        self._max_in_flight = max_in_flight
+        self._in_flight = 0
+        self._waiters = []  # heap of (priority, seq, future)
+        self._seq = itertools.count()
+        self._pending = {}  # coalescing key -> task
+        self.coalesced = 0
+        self.throttled = 0
+
+    async def run(self, key, priority, request):
+        """Run request() once admitted, key=None disables coalescing."""
+        if key is None:
+            return await self._run(priority, request)
+        task = self._pending.get(key)
+        if task is None:
+            task = self._pending[key] = asyncio.ensure_future(self._run(priority, request))
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+        else:
+            self.coalesced += 1
+        # A cancelled caller must not cancel the request the others wait on
+        return await asyncio.shield(task)
+
+    async def _run(self, priority, request):
+        await self._acquire(priority)
+        try:
+            delay = self._bucket.reserve()
+            if delay:
+                self.throttled += 1
+                await asyncio.sleep(delay)
+            return await request()
+        finally:
+            self._release()
+
+    async def _acquire(self, priority):
+        if self._in_flight < self._max_in_flight and not self._waiters:
+            self._in_flight += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            # The slot may have been handed over right before the cancellation
+            if future.done() and not future.cancelled():
+                self._release()
+            raise
+
+    def _release(self):
+        # Hand the slot straight to the most urgent live waiter
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._in_flight -= 1
+
+    def as_dict(self):
+        return {
+            "in_flight": self._in_flight,
+            "waiting": sum(1 for _, _, future in self._waiters if not future.done()),
+            "coalesced": self.coalesced,
+            "throttled": self.throttled,
+        }
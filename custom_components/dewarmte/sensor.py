@@ -1,35 +1,216 @@
 import logging
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Callable
+
 from homeassistant.components.sensor import (
     SensorEntity,
+    SensorEntityDescription,
     SensorDeviceClass, SensorStateClass,
 )
-from homeassistant.const import UnitOfTemperature, UnitOfEnergy, UnitOfVolumeFlowRate
+from homeassistant.const import EntityCategory, UnitOfTemperature, UnitOfEnergy, UnitOfPower, UnitOfTime, UnitOfVolumeFlowRate
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.device_registry import DeviceInfo
-
-from .const import DOMAIN
+from homeassistant.helpers.device_registry import DeviceEntryType, DeviceInfo
+
+from .entity import (
+    DeWarmteEntity,
+    DeWarmteEntityDescription,
+    async_track_device_entities,
+    section_available,
+    section_value,
+    tier_available,
+    tier_value,
+)
+from .const import DOMAIN, COP_WINDOWS, TIER_STATUS, TIER_OUTDOOR, TIER_INSIGHTS
+from .derived import RUNNING_STAT_KEYS
 
 _LOGGER = logging.getLogger(__name__)
 
-STATUS_KEYS = {
-    "supply_temperature": (SensorDeviceClass.TEMPERATURE, UnitOfTemperature.CELSIUS, "status"),
-    "target_temperature": (SensorDeviceClass.TEMPERATURE, UnitOfTemperature.CELSIUS, "status"),
-    "actual_temperature": (SensorDeviceClass.TEMPERATURE, UnitOfTemperature.CELSIUS, "status"),
-    "heat_sum": (SensorDeviceClass.ENERGY, UnitOfEnergy.KILO_WATT_HOUR, "insights"),
-    "cop": ("", "", "insights"),
-    "heat_input": (SensorDeviceClass.ENERGY, UnitOfEnergy.KILO_WATT_HOUR, "status"),
-    "heat_output": (SensorDeviceClass.ENERGY, UnitOfEnergy.KILO_WATT_HOUR, "status"),
-    "water_flow": (SensorDeviceClass.VOLUME_FLOW_RATE, UnitOfVolumeFlowRate.LITERS_PER_MINUTE, "status"),
-    "electricity_consumption": (SensorDeviceClass.ENERGY, UnitOfEnergy.KILO_WATT_HOUR, "status")
-}
 
-STATS_KEYS = {
-    "daily_consumed_electricity": (SensorDeviceClass.ENERGY, UnitOfEnergy.KILO_WATT_HOUR, "insights", SensorStateClass.TOTAL_INCREASING),
+@dataclass(frozen=True, kw_only=True)
+class DeWarmteSensorEntityDescription(DeWarmteEntityDescription, SensorEntityDescription):
+    """Describes a DeWarmte device sensor."""
+
+
+def _device_sensor(key, tier, device_class, unit, state_class=None):
+    """Sensor reading data[device_id][tier][key] of a per-device tier."""
+    return DeWarmteSensorEntityDescription(
+        key=key,
+        tier=tier,
+        section=tier,
+        value_fn=section_value(tier, key),
+        available_fn=section_available(tier),
+        device_class=device_class,
+        native_unit_of_measurement=unit,
+        state_class=state_class,
+    )
+
+
+SENSORS = (
+    _device_sensor("supply_temperature", TIER_STATUS, SensorDeviceClass.TEMPERATURE, UnitOfTemperature.CELSIUS),
+    _device_sensor("target_temperature", TIER_STATUS, SensorDeviceClass.TEMPERATURE, UnitOfTemperature.CELSIUS),
+    _device_sensor("actual_temperature", TIER_STATUS, SensorDeviceClass.TEMPERATURE, UnitOfTemperature.CELSIUS),
+    _device_sensor("heat_sum", TIER_INSIGHTS, SensorDeviceClass.ENERGY, UnitOfEnergy.KILO_WATT_HOUR),
+    _device_sensor("cop", TIER_INSIGHTS, None, None),
+    _device_sensor("heat_input", TIER_STATUS, SensorDeviceClass.POWER, UnitOfPower.KILO_WATT),
+    _device_sensor("heat_output", TIER_STATUS, SensorDeviceClass.POWER, UnitOfPower.KILO_WATT),
+    _device_sensor("water_flow", TIER_STATUS, SensorDeviceClass.VOLUME_FLOW_RATE, UnitOfVolumeFlowRate.LITERS_PER_MINUTE),
+    _device_sensor("electricity_consumption", TIER_STATUS, SensorDeviceClass.ENERGY, UnitOfEnergy.KILO_WATT_HOUR),
+    _device_sensor(
+        "daily_consumed_electricity",
+        TIER_INSIGHTS,
+        SensorDeviceClass.ENERGY,
+        UnitOfEnergy.KILO_WATT_HOUR,
+        SensorStateClass.TOTAL_INCREASING,
+    ),
+    # The outdoor tier has one value for the account, shown on every device
+    DeWarmteSensorEntityDescription(
+        key="outside_temperature",
+        tier=TIER_OUTDOOR,
+        section=None,
+        value_fn=tier_value,
+        available_fn=tier_available,
+        device_class=SensorDeviceClass.TEMPERATURE,
+        native_unit_of_measurement=UnitOfTemperature.CELSIUS,
+    ),
+)
+
+
+def _derived_value(read):
+    def _value(source, device_id):
+        metrics = source.get(device_id)
+        return None if metrics is None else read(metrics)
+    return _value
+
+
+def _derived_available(source, device_id):
+    return source.get(device_id) is not None
+
+
+def _running_stat(key, attr):
+    def _read(metrics):
+        stats = metrics.running(key)
+        return None if stats is None else getattr(stats, attr)
+    return _read
+
+
+def _derived_sensor(
+    key,
+    read,
+    device_class=None,
+    unit=None,
+    state_class=SensorStateClass.MEASUREMENT,
+    tier=TIER_STATUS,
+    available_fn=_derived_available,
+):
+    """Sensor computed by an account-level engine fed by the tier."""
+    return DeWarmteSensorEntityDescription(
+        key=key,
+        tier=tier,
+        section=tier,
+        value_fn=_derived_value(read),
+        available_fn=available_fn,
+        device_class=device_class,
+        native_unit_of_measurement=unit,
+        state_class=state_class,
+    )
+
+
+_RUNNING_STAT_UNITS = {
+    "supply_temperature": (SensorDeviceClass.TEMPERATURE, UnitOfTemperature.CELSIUS),
+    "water_flow": (SensorDeviceClass.VOLUME_FLOW_RATE, UnitOfVolumeFlowRate.LITERS_PER_MINUTE),
 }
 
+DERIVED_SENSORS = (
+    _derived_sensor(
+        "heat_input_energy",
+        lambda metrics: round(metrics.heat_input_energy, 3),
+        SensorDeviceClass.ENERGY,
+        UnitOfEnergy.KILO_WATT_HOUR,
+        SensorStateClass.TOTAL_INCREASING,
+    ),
+    _derived_sensor(
+        "heat_output_energy",
+        lambda metrics: round(metrics.heat_output_energy, 3),
+        SensorDeviceClass.ENERGY,
+        UnitOfEnergy.KILO_WATT_HOUR,
+        SensorStateClass.TOTAL_INCREASING,
+    ),
+    *(
+        _derived_sensor(f"cop_{window}", lambda metrics, window=window: metrics.cop(window))
+        for window in COP_WINDOWS
+    ),
+    *(
+        _derived_sensor(f"{key}_{attr}", _running_stat(key, attr), *_RUNNING_STAT_UNITS[key])
+        for key in RUNNING_STAT_KEYS
+        for attr in ("min", "max", "mean")
+    ),
+)
+
+
+def _history_covers(period):
+    # A partial total would read as the complete one, so unavailable until the backfill covers the period
+    return lambda history, device_id: history.covers(device_id, period)
+
+
+# Read from the rollups of the hourly insights history, closed hours only
+HISTORY_SENSORS = (
+    *(
+        _derived_sensor(
+            f"{metric}_this_{period}",
+            lambda series, metric=metric, period=period: series.total(period, metric),
+            SensorDeviceClass.ENERGY,
+            UnitOfEnergy.KILO_WATT_HOUR,
+            SensorStateClass.TOTAL_INCREASING,
+            TIER_INSIGHTS,
+            _history_covers(period),
+        )
+        for period in ("week", "month", "year")
+        for metric in ("electricity", "heat")
+    ),
+    *(
+        _derived_sensor(
+            f"cop_this_{period}",
+            lambda series, period=period: series.cop_of(period),
+            tier=TIER_INSIGHTS,
+            available_fn=_history_covers(period),
+        )
+        for period in ("week", "month", "year")
+    ),
+)
+
+
+@dataclass(frozen=True, kw_only=True)
+class ApiSensorEntityDescription(SensorEntityDescription):
+    """Describes a request metric of the API client."""
+
+    tier: str
+    value_fn: Callable[[Any], Any]
+
+
+def _api_sensors():
+    for tier in (TIER_STATUS, TIER_OUTDOOR, TIER_INSIGHTS):
+        yield ApiSensorEntityDescription(
+            key=f"last_{tier}_poll_duration",
+            name=f"DeWarmte Last {tier.title()} Poll Duration",
+            tier=tier,
+            value_fn=lambda metrics, tier=tier: metrics.last_cycle_ms(tier),
+            native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        )
+    yield ApiSensorEntityDescription(
+        key="api_calls_per_hour",
+        name="DeWarmte API Calls Per Hour",
+        tier=TIER_STATUS,
+        value_fn=lambda metrics: metrics.calls_last_hour,
+        native_unit_of_measurement="calls/h",
+    )
+
+
+API_SENSORS = tuple(_api_sensors())
+
 
 async def async_setup_entry(
     hass: HomeAssistant,
@@ -38,194 +219,93 @@ async def async_setup_entry(
 ) -> None:
     """Set up MyIntegration sensors from config entry."""
 
-    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinaFtor"]
-    entities = []
-
-
-    for device_id, device in coordinator.data.items():
-        nickname = device.get("nickname", device_id)
-        device_model = device.get("type", {})
-
-        for key, (device_class, unit, target_api) in STATUS_KEYS.items():
-            name = f"{nickname} {key.replace('_', ' ').title()}"
-            entities.append(
-                MySensor(
-                    coordinator=coordinator,
-                    device_id=device_id,
-                    device_name=nickname,
-                    device_model = device_model,
-                    key=key,
-                    name=name,
-                    unit=unit,
-                    target_api= target_api,
-                    device_class=device_class
-                )
-            )
+    entry_data = hass.data[DOMAIN][entry.entry_id]
+    coordinators = entry_data["coordinators"]
+    derived = entry_data["account"].derived
+    history = entry_data["account"].history
 
-        for key, (device_class, unit, target_api, state_class) in STATS_KEYS.items():
-            name = f"{nickname} {key.replace('_', ' ').title()}"
-            entities.append(
-                StatsSensor(
-                    coordinator=coordinator,
-                    device_id=device_id,
-                    device_name=nickname,
-                    device_model = device_model,
-                    key=key,
-                    name=name,
-                    unit=unit,
-                    target_api= target_api,
-                    device_class=device_class,
-                    state_class = state_class
-                )
+    def _device_entities(device_id, device):
+        for description in SENSORS:
+            yield description.key, partial(
+                DeWarmteSensor, coordinators[description.tier], description, device_id, device.nickname, device.model
             )
-
-        key="outside_temperature"
-        entities.append(
-            OutdoorSensor(
-                coordinator=coordinator,
-                device_id=device_id,
-                device_name=nickname,
-                device_model=device_model,
-                key=key,
-                name=f"{nickname} {key.replace('_', ' ').title()}",
-                unit=UnitOfTemperature.CELSIUS,
-                device_class=SensorDeviceClass.TEMPERATURE
+        for description in DERIVED_SENSORS:
+            yield description.key, partial(
+                DerivedSensor, coordinators[TIER_STATUS], description, device_id, device.nickname, device.model, derived
+            )
+        for description in HISTORY_SENSORS:
+            yield description.key, partial(
+                DerivedSensor, coordinators[TIER_INSIGHTS], description, device_id, device.nickname, device.model, history
             )
-        )
 
-    if entities:
-        async_add_entities(entities)
+    async_track_device_entities(entry, entry_data, coordinators[TIER_STATUS], _device_entities, async_add_entities)
 
+    # Request metrics of the API client, disabled until someone needs them
+    client = entry_data["client"]
+    async_add_entities(
+        ApiDiagnosticSensor(coordinators[description.tier], description, client, entry.entry_id)
+        for description in API_SENSORS
+    )
 
-class MySensor(CoordinatorEntity, SensorEntity):
-    """Representation of a sensor pulled from the API via coordinator."""
 
-    def __init__(self, coordinator, device_id, device_name, device_model, key, name, unit, device_class, target_api):
-        super().__init__(coordinator)
-        self.device_id = device_id
-        self.key = key
-        self.device_name = device_name
-        self.device_model = device_model
-        self.target_api = target_api
-
-        self._attr_name = name
-        self._attr_unique_id = f"{device_id}_{key}"
-        self._attr_unit_of_measurement = unit
-        self._attr_device_class = device_class
-        self._attr_should_poll = False
-        self._attr_native_unit_of_measurement = unit
+class DeWarmteSensor(DeWarmteEntity, SensorEntity):
+    """Sensor of a DeWarmte device."""
+
+    entity_description: DeWarmteSensorEntityDescription
 
     @property
     def native_value(self):
         """Return the sensor value."""
-        device_data = self.coordinator.data.get(self.device_id, {})
-        value = device_data.get(self.target_api, {}).get(self.key)
-        return value
-
-    @property
-    def available(self):
-        """Return True if entity is available."""
-        return (
-            super().available
-            and self.device_id in self.coordinator.data
-            and self.coordinator.data[self.device_id].get(self.target_api) is not None
-        )
+        return self._value
 
-    @property
-    def device_info(self) -> DeviceInfo:
-        return DeviceInfo(
-            identifiers={(DOMAIN, self.device_id)},
-            name=self.device_name,
-            manufacturer="DeWarmte",
-            model=self.device_model,
-            configuration_url="https://my.dewarmte.com",
-        )
 
-class OutdoorSensor(CoordinatorEntity, SensorEntity):
-
-    def __init__(self, coordinator, device_id, device_name, device_model, key, name, unit, device_class):
-        super().__init__(coordinator)
-        self.device_id = device_id
-        self.key = key
-        self.device_name = device_name
-        self.device_model = device_model
+class DerivedSensor(DeWarmteSensor):
+    """Sensor of a device computed by an account-level engine, see derived.py and history.py.
 
+    source has get(device_id) and updated, the devices it changed in the
+    update being dispatched.
+    """
 
-        self._attr_name = name
-        self._attr_unique_id = f"{device_id}_{key}"
-        self._attr_unit_of_measurement = unit
-        self._attr_device_class = device_class
-        self._attr_should_poll = False
-        self._attr_native_unit_of_measurement = unit
+    def __init__(self, coordinator, description, device_id, device_name, device_model, source):
+        super().__init__(coordinator, description, device_id, device_name, device_model)
+        self.source = source
 
     @property
-    def native_value(self):
-        """Return the sensor value."""
-        device_data = self.coordinator.data.get(self.device_id, {})
-        value = device_data.get("outdoor_temp", {})
-        return value
+    def _source(self):
+        return self.source
 
-    @property
-    def available(self):
-        """Return True if entity is available."""
-        return (
-                super().available
-                and self.device_id in self.coordinator.data
-                and self.coordinator.data[self.device_id].get("outdoor_temp") is not None
-        )
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write when the engine took a sample of our device or availability flipped."""
+        if self.coordinator.changed_keys is None or self.device_id in self.source.updated:
+            CoordinatorEntity._handle_coordinator_update(self)
 
-    @property
-    def device_info(self) -> DeviceInfo:
-        return DeviceInfo(
-            identifiers={(DOMAIN, self.device_id)},
-            name=self.device_name,
-            manufacturer="DeWarmte",
-            model=self.device_model,
-            configuration_url="https://my.dewarmte.com",
-        )
 
-class StatsSensor(CoordinatorEntity, SensorEntity):
-    """
-    EnergySensor will represent the analytics from API
-    """
-    def __init__(self, coordinator, device_id, device_name, device_model, key, name, unit, device_class, target_api, state_class):
-        super().__init__(coordinator)
-        self.device_id = device_id
-        self.key = key
-        self.device_name = device_name
-        self.device_model = device_model
-        self.target_api = target_api
-        self._attr_name = name
-        self._attr_unique_id = f"{device_id}_{key}"
-        self._attr_unit_of_measurement = unit
-        self._attr_device_class = device_class
-        self._attr_should_poll = False
-        self._attr_state_class = state_class
-        self._attr_native_unit_of_measurement = unit
+class ApiDiagnosticSensor(CoordinatorEntity, SensorEntity):
+    """Request metrics of the API client, updated with its coordinator."""
 
-    @property
-    def native_value(self):
-        """Return the sensor value."""
-        device_data = self.coordinator.data.get(self.device_id, {})
-        value = device_data.get(self.target_api, {}).get(self.key)
-        return value
+    entity_description: ApiSensorEntityDescription
 
-    @property
-    def available(self):
-        """Return True if entity is available."""
-        return (
-                super().available
-                and self.device_id in self.coordinator.data
-                and self.coordinator.data[self.device_id].get(self.target_api) is not None
-        )
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _attr_should_poll = False
+    _attr_state_class = SensorStateClass.MEASUREMENT
 
-    @property
-    def device_info(self) -> DeviceInfo:
-        return DeviceInfo(
-            identifiers={(DOMAIN, self.device_id)},
-            name=self.device_name,
+    def __init__(self, coordinator, description, client, entry_id):
+        super().__init__(coordinator)
+        self.entity_description = description
+        self.client = client
+        self._value_fn = description.value_fn
+
+        self._attr_unique_id = f"{entry_id}_{description.key}"
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, f"{entry_id}_api")},
+            name="DeWarmte API",
             manufacturer="DeWarmte",
-            model=self.device_model,
-            configuration_url="https://my.dewarmte.com",
+            entry_type=DeviceEntryType.SERVICE,
         )
 
+    @property
+    def native_value(self):
+        """Return the metric value."""
+        return self._value_fn(self.client.metrics)
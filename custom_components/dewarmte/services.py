@@ -0,0 +1,70 @@
+import logging
+
+import voluptuous as vol
+
+from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import device_registry as dr
+import homeassistant.helpers.config_validation as cv
+
+from .const import DOMAIN, TIER_STATUS, TIER_OUTDOOR, TIER_INSIGHTS
+from .profiling import async_profile_account
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_PROFILE = "profile"
+SERVICE_REFRESH = "refresh"
+
+TIERS = (TIER_STATUS, TIER_OUTDOOR, TIER_INSIGHTS)
+
+PROFILE_SCHEMA = vol.Schema(
+    {vol.Optional("cycles", default=3): vol.All(vol.Coerce(int), vol.Range(min=1, max=50))}
+)
+
+REFRESH_SCHEMA = vol.Schema(
+    {
+        vol.Optional("device_id"): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional("tier", default=list(TIERS)): vol.All(cv.ensure_list, [vol.In(TIERS)]),
+    }
+)
+
+
+def _api_device_ids(hass, registry_ids):
+    """Map device registry ids to DeWarmte device ids (as strings)."""
+    registry = dr.async_get(hass)
+    device_ids = set()
+    for registry_id in registry_ids:
+        device = registry.async_get(registry_id)
+        if device is None:
+            raise HomeAssistantError(f"Unknown device: {registry_id}")
+        device_ids.update(str(identifier) for domain, identifier in device.identifiers if domain == DOMAIN)
+    return device_ids
+
+
+def async_setup_services(hass: HomeAssistant):
+    """Register the integration services."""
+
+    async def _async_profile(call: ServiceCall):
+        accounts = hass.data.get(DOMAIN, {}).get("accounts", {})
+        if not accounts:
+            raise HomeAssistantError("No DeWarmte account is loaded")
+        started = [account.key for account in accounts.values() if async_profile_account(hass, account, call.data["cycles"])]
+        if not started:
+            raise HomeAssistantError("A profile is already running")
+        _LOGGER.info("Profiling the next %s update cycles", call.data["cycles"])
+
+    async def _async_refresh(call: ServiceCall):
+        accounts = hass.data.get(DOMAIN, {}).get("accounts", {})
+        selected = _api_device_ids(hass, call.data["device_id"]) if "device_id" in call.data else None
+        for account in accounts.values():
+            device_ids = None
+            if selected is not None:
+                device_ids = {device_id for device_id in account.device_names() if str(device_id) in selected}
+                if not device_ids:
+                    continue
+            # Status and outdoor are one request for all devices, only insights go per device
+            for tier in call.data["tier"]:
+                await account.coordinators[tier].async_request_refresh_for(device_ids)
+
+    hass.services.async_register(DOMAIN, SERVICE_PROFILE, _async_profile, schema=PROFILE_SCHEMA)
+    hass.services.async_register(DOMAIN, SERVICE_REFRESH, _async_refresh, schema=REFRESH_SCHEMA)
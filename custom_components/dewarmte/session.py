@@ -0,0 +1,66 @@
+import logging
+
+import aiohttp
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.util import ssl as ssl_util
+from homeassistant.util.json import json_dumps
+
+from .const import (
+    API_MAX_IN_FLIGHT,
+    HTTP_POOL_HEADROOM,
+    HTTP_KEEPALIVE_TIMEOUT,
+    HTTP_DNS_CACHE_TTL,
+    AUTH_TIMEOUT,
+    ENDPOINT_TIMEOUTS,
+    DEFAULT_ENDPOINT_TIMEOUT,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+try:
+    import brotli  # noqa: F401  aiohttp decodes br when it is installed
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+else:
+    ACCEPT_ENCODING = "gzip, deflate, br"
+
+
+def _timeout(total, connect, sock_read):
+    return aiohttp.ClientTimeout(total=total, connect=connect, sock_read=sock_read)
+
+
+AUTH_CLIENT_TIMEOUT = _timeout(*AUTH_TIMEOUT)
+_ENDPOINT_CLIENT_TIMEOUTS = {endpoint: _timeout(*values) for endpoint, values in ENDPOINT_TIMEOUTS.items()}
+_DEFAULT_CLIENT_TIMEOUT = _timeout(*DEFAULT_ENDPOINT_TIMEOUT)
+
+
+def endpoint_timeout(endpoint):
+    """Return the ClientTimeout of an endpoint as named by metrics.endpoint_name()."""
+    return _ENDPOINT_CLIENT_TIMEOUTS.get(endpoint, _DEFAULT_CLIENT_TIMEOUT)
+
+
+@callback
+def async_create_session(hass: HomeAssistant) -> aiohttp.ClientSession:
+    """Return a new session for one account, the account closes it.
+
+    Its own connector keeps a pool of keep-alive connections to the API host
+    and caches DNS, so polls reuse warm connections. The pool holds every
+    request the account's scheduler lets through, the connect timeout is
+    never spent waiting for another account's connection.
+    """
+    pool_size = API_MAX_IN_FLIGHT + HTTP_POOL_HEADROOM
+    connector = aiohttp.TCPConnector(
+        limit=pool_size,
+        limit_per_host=pool_size,
+        keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+        ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+        enable_cleanup_closed=True,
+        ssl=ssl_util.get_default_context(),
+    )
+    session = aiohttp.ClientSession(
+        connector=connector,
+        headers={"Accept-Encoding": ACCEPT_ENCODING},
+        json_serialize=json_dumps,
+    )
+    return session
@@ -0,0 +1,98 @@
+import logging
+from datetime import timedelta
+
+from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
+from homeassistant.components.recorder.statistics import async_add_external_statistics
+from homeassistant.const import UnitOfEnergy
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util, slugify
+
+from .const import DOMAIN, DEFAULT_BACKFILL_DAYS
+from .insights import BUCKET_ELECTRICITY, BUCKET_HEAT, BUCKET_COP
+from .storage import DeWarmteStore
+
+_LOGGER = logging.getLogger(__name__)
+
+# metric -> (bucket field, unit, has_sum); metrics without a sum are means
+STATISTICS = {
+    "electricity_consumed": (BUCKET_ELECTRICITY, UnitOfEnergy.KILO_WATT_HOUR, True),
+    "heat_produced": (BUCKET_HEAT, UnitOfEnergy.KILO_WATT_HOUR, True),
+    "cop": (BUCKET_COP, None, False),
+}
+
+
+def statistic_id(device_id, metric):
+    return f"{DOMAIN}:{slugify(str(device_id))}_{metric}"
+
+
+class InsightsStatisticsImporter:
+    """Write hourly insights buckets into long-term statistics.
+
+    Buckets come from InsightsBackfill, past days first and then the hours
+    closed since the checkpoint. The checkpoint (last imported hour and
+    running sums per device) is kept in the entry store so an interrupted
+    backfill resumes where it stopped.
+    """
+
+    def __init__(self, hass: HomeAssistant, store: DeWarmteStore, backfill_days=DEFAULT_BACKFILL_DAYS):
+        self.hass = hass
+        self._store = store
+        self._backfill_days = backfill_days
+        self._checkpoints = store.statistics_checkpoint
+
+    def _metadata(self, device_id, device_name, metric):
+        _, unit, has_sum = STATISTICS[metric]
+        return StatisticMetaData(
+            has_mean=not has_sum,
+            has_sum=has_sum,
+            name=f"{device_name} {metric.replace('_', ' ').title()}",
+            source=DOMAIN,
+            statistic_id=statistic_id(device_id, metric),
+            unit_of_measurement=unit,
+        )
+
+    def first_missing_hour(self, device_id):
+        """Return the start of the first hour not imported yet, None if there is nothing to backfill."""
+        last_start = self._last_start(device_id)
+        if last_start is not None:
+            return last_start + timedelta(hours=1)
+        if not self._backfill_days:
+            return None
+        return dt_util.start_of_local_day(dt_util.now().date() - timedelta(days=self._backfill_days))
+
+    def _last_start(self, device_id):
+        checkpoint = self._checkpoints.get(str(device_id))
+        if checkpoint and checkpoint.get("last_start"):
+            return dt_util.parse_datetime(checkpoint["last_start"])
+        return None
+
+    def add_buckets(self, device_id, device_name, buckets):
+        """Import (start, data_point) closed hours, those up to the checkpoint are skipped."""
+        checkpoint = self._checkpoints.setdefault(str(device_id), {"last_start": None, "sums": {}})
+        sums = checkpoint["sums"]
+        last_start = self._last_start(device_id)
+        rows = {metric: [] for metric in STATISTICS}
+
+        for start, data_point in buckets:
+            if last_start is not None and start <= last_start:
+                continue
+            for metric, (field, _, has_sum) in STATISTICS.items():
+                value = data_point.get(field)
+                if value is None:
+                    continue
+                if has_sum:
+                    sums[metric] = sums.get(metric, 0) + value
+                    rows[metric].append(StatisticData(start=start, state=value, sum=sums[metric]))
+                else:
+                    rows[metric].append(StatisticData(start=start, mean=value, min=value, max=value))
+            last_start = start
+
+        if not any(rows.values()):
+            return
+        for metric, statistics in rows.items():
+            if statistics:
+                async_add_external_statistics(
+                    self.hass, self._metadata(device_id, device_name, metric), statistics
+                )
+        checkpoint["last_start"] = last_start.isoformat()
+        self._store.save_statistics_checkpoint(self._checkpoints)
@@ -0,0 +1,94 @@
+import logging
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN
+from .models import snapshot_from_json, snapshot_to_json
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+STORAGE_SAVE_DELAY = 30  # seconds, coalesces writes from consecutive polls
+HISTORY_SAVE_DELAY = 600  # the history only grows by an hour at a time
+
+
+class DeWarmteStore:
+    """Tokens and last coordinator snapshots of one config entry."""
+
+    def __init__(self, hass: HomeAssistant, entry_id):
+        self._store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}")
+        # The hourly insights history is larger and changes less often, it gets its own file
+        self._history_store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}.history")
+        self._data = {}
+        self._pending = {}  # Store -> data function of its last scheduled save
+
+    async def async_load(self):
+        self._data = await self._store.async_load() or {}
+        return self._data
+
+    async def async_load_history(self):
+        return await self._history_store.async_load()
+
+    def save_history(self, data_func):
+        """Schedule a history save, data_func is called when it is written."""
+        self._delay_save(self._history_store, data_func, HISTORY_SAVE_DELAY)
+
+    @property
+    def tokens(self):
+        return self._data.get("tokens")
+
+    @property
+    def snapshots(self):
+        snapshots = {}
+        for tier, stored in self._data.get("snapshots", {}).items():
+            try:
+                snapshots[tier] = snapshot_from_json(tier, stored)
+            except (KeyError, TypeError, ValueError, AttributeError) as err:
+                # The tier is polled before entities are created instead
+                _LOGGER.debug("Ignoring unreadable %s snapshot: %s", tier, err)
+        return snapshots
+
+    @property
+    def statistics_checkpoint(self):
+        return self._data.setdefault("statistics", {})
+
+    def save_statistics_checkpoint(self, checkpoint):
+        self._data["statistics"] = checkpoint
+        self._schedule_save()
+
+    @property
+    def derived(self):
+        return self._data.get("derived")
+
+    def save_derived(self, derived):
+        self._data["derived"] = derived
+        self._schedule_save()
+
+    def save_tokens(self, tokens):
+        self._data["tokens"] = tokens
+        self._schedule_save()
+
+    def save_snapshot(self, tier, data):
+        self._data.setdefault("snapshots", {})[tier] = snapshot_to_json(tier, data)
+        self._schedule_save()
+
+    def _schedule_save(self):
+        self._delay_save(self._store, lambda: self._data, STORAGE_SAVE_DELAY)
+
+    def _delay_save(self, store, data_func, delay):
+        self._pending[store] = data_func
+        store.async_delay_save(data_func, delay)
+
+    async def async_flush(self):
+        """Write the scheduled saves now, nothing is left to write after shutdown."""
+        pending, self._pending = self._pending, {}
+        for store, data_func in pending.items():
+            # Cancels the delayed save
+            await store.async_save(data_func())
+
+    async def async_remove(self):
+        """Remove both files, scheduled saves are cancelled so they can't write them back."""
+        self._pending = {}
+        await self._store.async_remove()
+        await self._history_store.async_remove()
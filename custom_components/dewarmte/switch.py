@@ -0,0 +1,81 @@
+import logging
+from dataclasses import dataclass
+from functools import partial
+
+from homeassistant.components.switch import SwitchDeviceClass, SwitchEntity, SwitchEntityDescription
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from . import exposes_device
+from .entity import (
+    DeWarmteControlEntity,
+    DeWarmteEntityDescription,
+    async_track_device_entities,
+    section_available,
+    section_value,
+)
+from .const import DOMAIN, TIER_STATUS
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, kw_only=True)
+class DeWarmteSwitchEntityDescription(DeWarmteEntityDescription, SwitchEntityDescription):
+    """Describes a DeWarmte device switch."""
+
+
+SWITCHES = (
+    DeWarmteSwitchEntityDescription(
+        key="is_on",
+        tier=TIER_STATUS,
+        section=TIER_STATUS,
+        value_fn=section_value(TIER_STATUS, "is_on"),
+        available_fn=section_available(TIER_STATUS),
+        device_class=SwitchDeviceClass.SWITCH,
+    ),
+)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up DeWarmte switches from config entry."""
+    entry_data = hass.data[DOMAIN][entry.entry_id]
+    coordinator = entry_data["coordinators"][TIER_STATUS]
+    writer = entry_data["account"].writer
+
+    def _device_entities(device_id, device):
+        status = device.status
+        # Devices found later are checked in the background, their controls come with a later update
+        if status is None or not writer.has_settings(device_id):
+            return
+        for description in SWITCHES:
+            if getattr(status, description.key) is not None:
+                yield description.key, partial(
+                    DeWarmteSwitch, coordinator, description, device_id, device.nickname, device.model, writer
+                )
+
+    # The settings endpoint is guessed, controls are only created where it exists
+    await writer.async_probe(
+        [device_id for device_id in coordinator.data or {} if exposes_device(entry_data, device_id)]
+    )
+    async_track_device_entities(entry, entry_data, coordinator, _device_entities, async_add_entities)
+
+
+class DeWarmteSwitch(DeWarmteControlEntity, SwitchEntity):
+    """Switch of a DeWarmte device."""
+
+    entity_description: DeWarmteSwitchEntityDescription
+
+    @property
+    def is_on(self):
+        return self._value
+
+    async def async_turn_on(self, **kwargs) -> None:
+        await self._async_write_value(True)
+
+    async def async_turn_off(self, **kwargs) -> None:
+        await self._async_write_value(False)
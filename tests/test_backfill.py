@@ -0,0 +1,107 @@
+"""InsightsBackfill across local midnight, with a fake API client and clock."""
+import asyncio
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+
+pytest.importorskip("homeassistant")
+
+from homeassistant.util import dt as dt_util  # noqa: E402
+
+from custom_components.dewarmte import statistics  # noqa: E402
+from custom_components.dewarmte.backfill import InsightsBackfill  # noqa: E402
+from custom_components.dewarmte.history import InsightsHistory  # noqa: E402
+from custom_components.dewarmte.insights import HourlyInsightsCache, hour_is_closed  # noqa: E402
+
+TZ = ZoneInfo("Europe/Amsterdam")
+DEVICE_ID = 1
+DATA_POINT = {"electricity_consumed": 1.0, "heat_produced": 4.0}
+
+
+class FakeHass:
+    def async_create_background_task(self, coro, name):
+        return asyncio.ensure_future(coro)
+
+
+class FakeStore:
+    def __init__(self):
+        self.statistics_checkpoint = {}
+
+    def save_statistics_checkpoint(self, checkpoints):
+        pass
+
+
+class FakeClient:
+    """Serves 24 hours for past days and polls today's hours into an insights cache."""
+
+    def __init__(self):
+        self.fetched_days = []
+        self.cache = HourlyInsightsCache()
+
+    async def async_get_hourly_insights(self, device_id, day, priority=None):
+        self.fetched_days.append(day)
+        return {"data": [DATA_POINT] * 24}
+
+    def insights_cache(self, device_id):
+        return self.cache
+
+    def poll(self, now):
+        self.cache.update([DATA_POINT] * (now.hour + 1), now)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    previous = dt_util.DEFAULT_TIME_ZONE
+    dt_util.set_default_time_zone(TZ)
+    clock = {"now": None}
+    monkeypatch.setattr(dt_util, "now", lambda time_zone=None: clock["now"])
+    yield clock
+    dt_util.set_default_time_zone(previous)
+
+
+@pytest.fixture
+def imported(monkeypatch):
+    starts = set()
+    monkeypatch.setattr(
+        statistics,
+        "async_add_external_statistics",
+        lambda hass, metadata, rows: starts.update(row["start"] for row in rows),
+    )
+    return starts
+
+
+def test_hour_before_midnight_is_imported(clock, imported):
+    client = FakeClient()
+    importer = statistics.InsightsStatisticsImporter(FakeHass(), FakeStore(), backfill_days=2)
+    history = InsightsHistory(retention_days=30)
+    backfill = InsightsBackfill(FakeHass(), client, (importer, history), lambda: None, history.set_live)
+
+    async def run():
+        now = datetime(2026, 3, 10, 9, 0, tzinfo=TZ)
+        while now < datetime(2026, 3, 12, 3, 0, tzinfo=TZ):
+            clock["now"] = now
+            client.poll(now)
+            history.begin_update()
+            backfill.async_update({DEVICE_ID: "Heat pump"})
+            # Complete only while no closed hour is missing
+            if history.covers(DEVICE_ID, "year"):
+                assert not hour_is_closed(history.first_missing_hour(DEVICE_ID), now)
+            for _ in range(50):
+                await asyncio.sleep(0)
+            now += timedelta(minutes=15)
+
+    asyncio.run(run())
+
+    first = datetime(2026, 3, 8, 0, 0, tzinfo=TZ)
+    expected = {first + timedelta(hours=n) for n in range(24 * 4 + 2)}
+    assert {dt_util.as_local(start) for start in imported} == expected
+    assert datetime(2026, 3, 10, 23, 0, tzinfo=TZ) in imported
+    assert datetime(2026, 3, 11, 23, 0, tzinfo=TZ) in imported
+    # The days that ended while polling are fetched once each, for their last hour
+    assert client.fetched_days.count(datetime(2026, 3, 10).date()) == 1
+    assert client.fetched_days.count(datetime(2026, 3, 11).date()) == 1
+    assert history.first_missing_hour(DEVICE_ID) == datetime(2026, 3, 12, 2, 0, tzinfo=TZ)
+    # Hours past the retention are only kept in the rollups
+    assert len(history.get(DEVICE_ID)) == 30 * 24 + 2
+    assert history.covers(DEVICE_ID, "year")